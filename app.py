@@ -1,56 +1,122 @@
 import streamlit as st
 import google.generativeai as genai
 from streamlit_mic_recorder import speech_to_text
-from gtts import gTTS
 import os
-from io import BytesIO
+import re
+import time
+import uuid
+import threading
+import httpx
 from dotenv import load_dotenv
+from langchain_huggingface import HuggingFaceEmbeddings
+from semantic_cache import SemanticCache
+from tts_cache import AudioCache
+from context_builder import ContextBuilder
+from relevance_gate import RelevanceGate
+from conversation_store import ConversationStore
+from vector_store import apply_search_params, load_index_meta, read_faiss_index
+from streaming_tts import ClipSequencer
+from voice_pipeline import LANGUAGES, REJECTION_MESSAGES, VoicePipeline, clean_text
+from tracing import TRACER, stage
+from outbound import GEMINI, TTS, OutboundModel, http_client
 
 load_dotenv()
 GEMINI_API_KEY = st.secrets.get("HF_TOKEN", os.getenv("HF_TOKEN"))
 genai.configure(api_key=GEMINI_API_KEY)
+# Stream the Gemini answer and synthesize it sentence by sentence (set to 0 to wait for the full answer)
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "1") == "1"
+# Optional token budget for the conversation context sent to Gemini (unset = no limit)
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS")) if os.getenv("CONTEXT_MAX_TOKENS") else None
+# Questions scoring below this similarity to vaccination topics are rejected without calling Gemini.
+# Off (0) by default: pick a value from evaluate_relevance_gate.py's precision/false-rejection table first.
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0"))
+# The gate's embedding model is English-only; Indic/Urdu-script questions skip it unless this is 1
+RELEVANCE_REJECT_NON_LATIN = os.getenv("RELEVANCE_REJECT_NON_LATIN", "0") == "1"
+DB_PATH = "vector_db"
+# Optional rag_service.py endpoint (e.g. http://127.0.0.1:8765) used to ground answers in vector_db
+RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL")
+# Messages kept (and rendered) per session; older ones only live on in the context window.
+# Streamlit replays the whole script on every rerun, so this window is re-rendered each
+# time; capping it is what bounds that cost, rendering is not incremental.
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))
+# Put the conversation's thread id in the URL (?thread=...) so a reload resumes it. The id
+# is the only key to the stored conversation: anyone who gets the URL can read it. Set to 0
+# to keep the id in the session only (a reload then starts a new conversation).
+THREAD_IN_URL = os.getenv("THREAD_IN_URL", "1") == "1"
+# Show p50/p95/p99 per pipeline stage in the sidebar (timings go to TRACE_PATH as JSON lines)
+SHOW_TIMINGS = os.getenv("SHOW_TIMINGS", "0") == "1"
 
+@st.cache_resource
 def load_gemini_llm():
+    # One model for the whole process; calls are coalesced, bounded and retried by outbound.GEMINI
     if not GEMINI_API_KEY:
         raise ValueError("Gemini API key not found.")
-    return genai.GenerativeModel("gemini-2.0-flash")  # Verify model availability
+    return OutboundModel(genai.GenerativeModel("gemini-2.0-flash"), GEMINI)  # Verify model availability
 
-def clean_text(text):
-    return text.replace("**", "").replace("*", "").strip()
+@st.cache_resource
+def get_embedding_model():
+    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
-def build_context(history, max_messages=5):
-    # [Unchanged context-building logic]
-    context = ""
-    recent_history = history[-max_messages * 2:] if len(history) > max_messages * 2 else history
-    vaccination_keywords = ["vacc", "टीक", "ভ্যাক", "વેક", "ವ್ಯಾಕ", "വാക്സ", "वैक्स", "వాక్స", "ویکس", "ਵੈਕ", "measles", "खसरा", "rubella", "रूबेला", "covid", "vitamin", "विटामिन"]
-    follow_up_keywords = ["where", "कहाँ", "online", "ऑनलाइन", "get", "पाएं", "this", "यह", "child", "बच्चा", "age", "उम्र", "portal", "पोर्टाल", "is", "क्या", "does", "दिया", "given", "supplement", "सप्लीमेंट", "necessary", "जरूरी"]
-    rejection_phrases = ["केवल टीकाकरण से संबंधित", "Ask me only vaccination-related", "শুধুমাত্র ভ্যাকসিনেশন"]
-    is_vaccination_context = False
-    i = 0
+@st.cache_resource
+def get_answer_cache():
+    # Shared by all sessions; set ANSWER_CACHE_PATH to keep answers across restarts
+    return SemanticCache(
+        get_embedding_model().embed_query,
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+        path=os.getenv("ANSWER_CACHE_PATH"),
+        save_interval=float(os.getenv("ANSWER_CACHE_SAVE_INTERVAL", "5")),
+    )
 
-    while i < len(recent_history) - 1:
-        user_msg = recent_history[i]
-        ai_msg = recent_history[i + 1] if i + 1 < len(recent_history) else None
-        
-        if user_msg['role'] == 'user' and ai_msg and ai_msg['role'] == 'assistant':
-            ai_content_lower = ai_msg['content'].lower()
-            if any(phrase in ai_content_lower for phrase in rejection_phrases):
-                i += 2
-                continue
-        
-        user_content_lower = user_msg['content'].lower()
-        if any(keyword in user_content_lower for keyword in vaccination_keywords) or \
-           (is_vaccination_context and any(keyword in user_content_lower for keyword in follow_up_keywords)):
-            context += f"Question: {user_msg['content']}\n"
-            if ai_msg and ai_msg['role'] == 'assistant':
-                context += f"Answer: {ai_msg['content']}\n"
-            is_vaccination_context = True
-            i += 2
-        else:
-            is_vaccination_context = False
-            i += 1
+@st.cache_resource
+def get_conversation_store():
+    return ConversationStore(os.getenv("CONVERSATION_DB", "conversations.sqlite"), window=HISTORY_WINDOW)
+
+@st.cache_resource
+def get_relevance_gate():
+    embedding_model = get_embedding_model()
+    index_file = os.path.join(DB_PATH, "index.faiss")
+    corpus_index = None
+    if os.path.exists(index_file):
+        # Only the index is needed, but searched with its nprobe/efSearch like load_vector_db does
+        corpus_index = read_faiss_index(index_file, mmap=True)
+        apply_search_params(corpus_index, load_index_meta(DB_PATH).get("params", {}))
+    return RelevanceGate(embedding_model.embed_query, threshold=RELEVANCE_THRESHOLD,
+                         corpus_index=corpus_index, embed_many=embedding_model.embed_documents,
+                         reject_non_latin=RELEVANCE_REJECT_NON_LATIN)
+
+def fetch_grounding(question, k=3):
+    # Answers still work without the service, they just aren't grounded
+    if not RAG_SERVICE_URL:
+        return ""
+    try:
+        response = http_client().post(f"{RAG_SERVICE_URL}/retrieve", json={"query": question, "k": k}, timeout=2.0)
+        response.raise_for_status()
+        return "\n\n".join(doc["text"] for doc in response.json()["documents"])
+    except (httpx.HTTPError, ValueError, KeyError):
+        return ""
+
+@st.cache_resource
+def get_tts_cache():
+    # Shared by all sessions; set TTS_CACHE_DIR to keep synthesized audio on disk
+    cache = AudioCache(max_bytes=int(os.getenv("TTS_CACHE_MB", "64")) * 1024 * 1024,
+                       disk_dir=os.getenv("TTS_CACHE_DIR"))
+    # Rejection messages are the most repeated answers, synthesize them once in the background
+    threading.Thread(
+        target=cache.prewarm,
+        args=([(message, LANGUAGES[lang], "co.in") for lang, message in REJECTION_MESSAGES.items()],),
+        daemon=True,
+    ).start()
+    return cache
 
-    return context.strip()
+def synthesize_speech(text, lang_code):
+    return get_tts_cache().get(clean_text(text), lang_code, "co.in")
+
+@st.cache_resource
+def get_pipeline():
+    gate = get_relevance_gate() if RELEVANCE_THRESHOLD > 0 else None
+    return VoicePipeline(load_gemini_llm, synthesize_speech, answer_cache=get_answer_cache(),
+                         relevance_gate=gate, fetch_grounding=fetch_grounding, stream=STREAM_ANSWERS)
 
 def main():
     ui_text = {
@@ -156,41 +222,59 @@ def main():
         }
     }
 
+    # Creating the cache starts the rejection-message prewarm on the first run, not the first answer
+    get_tts_cache()
+
+    # Time from st.rerun() after an answer until the script runs again
+    if 'rerun_started' in st.session_state:
+        TRACER.record("rerun", (time.perf_counter() - st.session_state.pop('rerun_started')) * 1000)
+    if SHOW_TIMINGS:
+        with st.sidebar.expander("Timings"):
+            st.code(TRACER.format_summary())
+            st.json({"gemini": GEMINI.stats(), "tts": TTS.stats()})
+
+    if 'thread_id' not in st.session_state:
+        # Only ids this app generated are resumed (random uuid4 hex), never guessable ones like "1"
+        thread_id = st.query_params.get("thread", "") if THREAD_IN_URL else ""
+        st.session_state.thread_id = thread_id if re.fullmatch(r"[0-9a-f]{32}", thread_id) else uuid.uuid4().hex
+        if THREAD_IN_URL:
+            st.query_params["thread"] = st.session_state.thread_id
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = get_conversation_store().history(st.session_state.thread_id)
+    if 'context_builder' not in st.session_state:
+        st.session_state.context_builder = ContextBuilder.from_history(
+            st.session_state.messages, max_messages=5, max_tokens=CONTEXT_MAX_TOKENS)
     if 'recording_count' not in st.session_state:
         st.session_state.recording_count = 0
     if 'recording_active' not in st.session_state:
         st.session_state.recording_active = False
 
-    languages = {
-        "Hindi": "hi", "English": "en", "Bengali": "bn", "Gujarati": "gu", "Kannada": "kn",
-        "Malayalam": "ml", "Marathi": "mr", "Tamil": "ta", "Telugu": "te", "Urdu": "ur", "Punjabi": "pa"
-    }
        
     if 'selected_lang' not in st.session_state:
         st.session_state.selected_lang = "Hindi"
          
-    lang_keys = list(languages.keys())
+    lang_keys = list(LANGUAGES.keys())
     selected_lang = st.selectbox(
         "जवाब की भाषा चुनें:",  # Static Hindi label
         lang_keys,
         index=lang_keys.index("Hindi")  # Pre-select Hindi
     )
     st.session_state.selected_lang = selected_lang  # Update session state
-    lang_code = languages[selected_lang]
+    lang_code = LANGUAGES[selected_lang]
 
     st.title(ui_text[st.session_state.selected_lang]["title"])
     st.write(ui_text[st.session_state.selected_lang]["subtitle"])
 
    
     st.session_state.selected_lang = selected_lang
-    lang_code = languages[selected_lang]
+    lang_code = LANGUAGES[selected_lang]
 
     for message in st.session_state.messages:
         st.chat_message(message['role']).markdown(message['content'])
 
     st.write(ui_text[selected_lang]["mic_prompt"])
+    # No "stt" stage: speech_to_text recognizes speech in the browser, timing the widget
+    # call here would only measure its render
     with st.spinner(ui_text[selected_lang]["stt_spinner"]):
         raw_text = speech_to_text(
             language=lang_code,
@@ -201,49 +285,47 @@ def main():
     if raw_text and not st.session_state.recording_active:
         try:
             st.session_state.recording_active = True
-            llm = load_gemini_llm()
-            context = build_context(st.session_state.messages, max_messages=5)
-
-            rejection_messages = {
-                "Hindi": "केवल टीकाकरण से संबंधित प्रश्न पूछें।",
-                "English": "Ask me only vaccination-related questions.",
-                "Bengali": "শুধুমাত্র ভ্যাকসিনেশন সম্পর্কিত প্রশ্ন জিজ্ঞাসা করুন।",
-                "Gujarati": "મને ફક્ત રસીકરણ સંબંધિત પ્રશ્નો પૂછો।",
-                "Kannada": "ನನಗೆ ಕೇವಲ ಲಸಿಕೆ ಸಂಬಂಧಿತ ಪ್ರಶ್ನೆಗಳನ್ನು ಕೇಳಿ।",
-                "Malayalam": "വാക്സിനേഷനുമായി ബന്ധപ്പെട്ട ചോദ്യങ്ങൾ മാത്രം ചോദിക്കുക।",
-                "Marathi": "मला फक्त लसीकरणाशी संबंधित प्रश्न विचारा।",
-                "Tamil": "தடுப்பூசி தொடர்பான கேள்விகளை மட்டும் கேளுங்கள்।",
-                "Telugu": "నాకు కేవలం వాక్సినేషన్ సంబంధిత ప్రశ్నలు మాత్రమే అడగండి।",
-                "Urdu": "مجھ سے صرف ویکسینیشن سے متعلق سوالات پوچھیں۔",
-                "Punjabi": "ਮੈਨੂੰ ਸਿਰਫ ਟੀਕਾਕਰਨ ਨਾਲ ਸਬੰਧਤ ਸਵਾਲ ਪੁੱਛੋ।"
-            }
+            with TRACER.request("voice_turn", lang=selected_lang) as trace:
+                with stage("build_context"):
+                    context = st.session_state.context_builder.context()
 
-            prompt = (
-                f"You are a vaccination assistant for India. Answer all questions in {selected_lang}, including rejections. "
-                "A question is vaccination-related if it contains terms like 'vaccine', 'vaccination', 'टीकाकरण', 'measles', 'खसरा', 'rubella', 'रूबेला', 'covid', 'vitamin', 'विटामिन', "
-                "or follow-up terms like 'where', 'कहाँ', 'get', 'पाएं', 'this', 'यह', 'child', 'बच्चा', 'is', 'क्या', 'does', 'दिया', 'given', 'supplement', 'सप्लीमेंट', 'necessary', 'जरूरी' "
-                "after a vaccination question. Use the context below only if the question relates to it. "
-                "If the question is not vaccination-related, respond with exactly: '{rejection_messages[selected_lang]}' and ignore context. "
-                f"Previous Vaccination-Related Context (if relevant):\n{context}\n\n"
-                f"Current Question: {raw_text}"
-            )
+                st.chat_message('user').markdown(raw_text)
+                assistant = st.chat_message('assistant')
+                with assistant:
+                    text_placeholder = st.empty()
+                    # Sentence clips autoplay one after another instead of all at once
+                    player = ClipSequencer(lambda audio: st.audio(audio, format="audio/mp3", autoplay=True))
 
-            response = llm.generate_content(prompt)
-            answer = clean_text(response.text)
+                    def render_text(partial):
+                        text_placeholder.markdown(f"{raw_text}  \n{partial}")
+                        player.pump()
 
-            output_text = f"{raw_text}  \n{answer}"
-            st.chat_message('user').markdown(raw_text)
-            st.chat_message('assistant').markdown(output_text)
-            st.session_state.messages.append({'role': 'user', 'content': raw_text})
-            st.session_state.messages.append({'role': 'assistant', 'content': answer})
+                    result = get_pipeline().answer(
+                        raw_text, selected_lang, context,
+                        on_text=render_text,
+                        on_audio=lambda audio, autoplay: player.play(audio) if autoplay
+                        else st.audio(audio, format="audio/mp3"),
+                        tts_context=lambda: st.spinner(ui_text[selected_lang]["tts_spinner"]),
+                    )
+                answer = result.answer
+                trace.attrs["source"] = result.source
 
-            with st.spinner(ui_text[selected_lang]["tts_spinner"]):
-                tts = gTTS(text=answer, lang=lang_code, tld="co.in")
-                tts.save("output.mp3")
-                st.audio("output.mp3")
+                with stage("persist"):
+                    st.session_state.messages.append({'role': 'user', 'content': raw_text})
+                    st.session_state.messages.append({'role': 'assistant', 'content': answer})
+                    del st.session_state.messages[:-HISTORY_WINDOW]
+                    conversation_store = get_conversation_store()
+                    conversation_store.append(st.session_state.thread_id, 'user', raw_text)
+                    conversation_store.append(st.session_state.thread_id, 'assistant', answer)
+                    st.session_state.context_builder.append('user', raw_text)
+                    st.session_state.context_builder.append('assistant', answer)
 
+            # Plays the clips still queued; the rerun clears this turn's audio, so wait for the last one
+            with assistant:
+                player.finish()
             st.session_state.recording_count += 1
             st.session_state.recording_active = False
+            st.session_state.rerun_started = time.perf_counter()
             st.rerun()
 
         except Exception as e:
@@ -0,0 +1,93 @@
+import time
+import random
+import argparse
+from context_builder import ContextBuilder, build_context
+
+# Replays recorded-style conversations turn by turn, checks that ContextBuilder gives
+# exactly the same context as build_context after every turn, and times both.
+
+QUESTIONS = {
+    "vaccination": [
+        "When is the measles vaccine given?",
+        "खसरा का टीका कब लगता है?",
+        "Is the covid vaccine safe for children?",
+        "रूबेला का टीका जरूरी है क्या?",
+        "ভ্যাকসিন কোথায় পাওয়া যায়?",
+        "Vitamin A supplement kab diya jata hai?",
+        "ਵੈਕਸੀਨ ਕਿੱਥੇ ਮਿਲਦੀ ਹੈ?",
+        "ویکسین کب لگتی ہے؟",
+    ],
+    "follow_up": [
+        "Where can I get this?",
+        "यह कहाँ मिलेगा?",
+        "What age is it given at?",
+        "Is it available online on the portal?",
+        "बच्चा कितनी उम्र का होना चाहिए?",
+        "Does my child need a second dose?",
+    ],
+    "off_topic": [
+        "Who won the cricket match yesterday?",
+        "आज मौसम कैसा है?",
+        "Tell me a joke",
+        "What is the capital of France?",
+        "মুম্বাই কত দূরে?",
+    ],
+}
+
+ANSWERS = [
+    "The measles-rubella vaccine is given at 9-12 months and again at 16-24 months.",
+    "आप इसे नजदीकी सरकारी स्वास्थ्य केंद्र पर मुफ्त में पा सकते हैं।",
+    "Yes, it is recommended for all children as per the national schedule.",
+    "Vitamin A is given every six months from 9 months to 5 years.",
+]
+
+REJECTIONS = [
+    "केवल टीकाकरण से संबंधित प्रश्न पूछें।",
+    "Ask me only vaccination-related questions.",
+    "শুধুমাত্র ভ্যাকসিনেশন সম্পর্কিত প্রশ্ন জিজ্ঞাসা করুন।",
+]
+
+def record_conversation(rng, turns):
+    messages = []
+    for _ in range(turns):
+        kind = rng.choices(["vaccination", "follow_up", "off_topic"], weights=[5, 3, 2])[0]
+        messages.append({'role': 'user', 'content': rng.choice(QUESTIONS[kind])})
+        answer = rng.choice(REJECTIONS) if kind == "off_topic" and rng.random() < 0.8 else rng.choice(ANSWERS)
+        messages.append({'role': 'assistant', 'content': answer})
+    return messages
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ContextBuilder against build_context and time both")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conversations = [record_conversation(rng, args.turns) for _ in range(args.conversations)]
+
+    legacy_time = incremental_time = 0.0
+    checked = 0
+    for messages in conversations:
+        builder = ContextBuilder(max_messages=5)
+        for n, message in enumerate(messages, start=1):
+            start = time.perf_counter()
+            builder.append(message['role'], message['content'])
+            incremental = builder.context()
+            incremental_time += time.perf_counter() - start
+
+            history = messages[:n]
+            start = time.perf_counter()
+            expected = build_context(history, max_messages=5)
+            legacy_time += time.perf_counter() - start
+
+            if incremental != expected:
+                raise SystemExit(f"Mismatch after {n} messages:\n{expected!r}\n!=\n{incremental!r}")
+            checked += 1
+
+    print(f"{checked} turns across {len(conversations)} conversations: outputs identical")
+    print(f"build_context:  {legacy_time / checked * 1e6:8.1f} us/turn")
+    print(f"ContextBuilder: {incremental_time / checked * 1e6:8.1f} us/turn")
+
+if __name__ == "__main__":
+    main()
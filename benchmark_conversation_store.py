@@ -0,0 +1,59 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+import resource
+from conversation_store import ConversationStore
+
+# Soak test: many threads talking for a long time. Append/history latency, rows kept,
+# database size and process RSS are printed per round and should stay flat once every
+# thread has filled its window; idle threads are evicted along the way.
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test ConversationStore")
+    parser.add_argument("--threads", type=int, default=200, help="active conversations")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=50, help="turns per active thread per round")
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.1, help="share of threads replaced by new users each round")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "soak.sqlite")
+        # Idle means "not seen this round": evict_idle(now=round start) with a zero TTL
+        store = ConversationStore(path, window=args.window, idle_ttl_seconds=0, evict_every=10 ** 9)
+        active = [f"user-{i}" for i in range(args.threads)]
+        next_user = args.threads
+        print(f"{'round':>5} {'append us':>10} {'history us':>11} {'threads':>8} {'messages':>9} {'db MB':>7} {'RSS MB':>7}")
+        for round_no in range(1, args.rounds + 1):
+            round_start = time.time()
+            append_time = history_time = 0.0
+            operations = 0
+            for _ in range(args.turns):
+                for thread_id in active:
+                    start = time.perf_counter()
+                    store.append(thread_id, "user", "When is the measles vaccine given? " * rng.randint(1, 4))
+                    store.append(thread_id, "assistant", "At 9-12 months and again at 16-24 months. " * rng.randint(1, 8))
+                    append_time += time.perf_counter() - start
+                    start = time.perf_counter()
+                    store.history(thread_id)
+                    history_time += time.perf_counter() - start
+                    operations += 1
+            store.evict_idle(now=round_start)
+            for i in rng.sample(range(len(active)), int(len(active) * args.churn)):
+                active[i] = f"user-{next_user}"
+                next_user += 1
+            stats = store.stats()
+            db_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+            print(f"{round_no:>5} {append_time / operations / 2 * 1e6:>10.1f} {history_time / operations * 1e6:>11.1f} "
+                  f"{stats['threads']:>8} {stats['messages']:>9} {db_mb:>7.2f} {rss_mb():>7.1f}")
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import time
+import pickle
+import argparse
+import faiss
+import numpy as np
+from langchain_community.embeddings import FakeEmbeddings
+from vector_store import all_vectors, load_vector_db
+from chunk_dedup import ChunkDeduplicator
+from benchmark_index import make_queries
+
+# Near-duplicate elimination on the chunks already in vector_db, without the embedding
+# model: vectors are taken from the stored index. Prints vectors, size and build time
+# with and without dedup, then for each k how many retrieved slots hold text that an
+# earlier result already covers ("duplicate slots") and how many distinct passages
+# from the exact top-k were missed ("unique-content misses").
+
+def serialized_mb(index, texts, metadatas):
+    return (faiss.serialize_index(index).nbytes + len(pickle.dumps((texts, metadatas)))) / 1e6
+
+def cluster_ids(database, threshold):
+    # Maps every stored vector position to the position of its canonical chunk
+    dedup = ChunkDeduplicator(threshold)
+    position_of = {doc_id: position for position, doc_id in database.index_to_docstore_id.items()}
+    clusters = np.empty(len(position_of), dtype="int64")
+    start = time.perf_counter()
+    for position in range(len(clusters)):
+        doc_id = database.index_to_docstore_id[position]
+        canonical = dedup.canonical(doc_id, database.docstore.search(doc_id).page_content)
+        clusters[position] = position if canonical is None else position_of[canonical]
+    return clusters, time.perf_counter() - start, dedup.stats
+
+def build_flat(vectors):
+    start = time.perf_counter()
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index, time.perf_counter() - start
+
+def evaluate(index, positions, clusters, queries, truth, k):
+    # positions maps index rows back to rows of the full index
+    _, found = index.search(queries, k)
+    duplicate_slots = misses = 0
+    for row, expected in zip(found, truth):
+        retrieved = [clusters[positions[p]] for p in row if p != -1]
+        duplicate_slots += len(retrieved) - len(set(retrieved))
+        misses += len(expected - set(retrieved))
+    return duplicate_slots / len(queries), misses / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate chunk elimination on vector_db")
+    parser.add_argument("--db-path", default="vector_db")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--max-k", type=int, default=5)
+    args = parser.parse_args()
+
+    database = load_vector_db(args.db_path, FakeEmbeddings(size=384))
+    vectors = np.ascontiguousarray(all_vectors(database.index), dtype="float32")
+    docs = [database.docstore.search(database.index_to_docstore_id[p]) for p in range(len(vectors))]
+    clusters, dedup_time, stats = cluster_ids(database, args.threshold)
+    kept = np.flatnonzero(clusters == np.arange(len(clusters)))
+
+    full, full_time = build_flat(vectors)
+    deduped, deduped_time = build_flat(vectors[kept])
+    full_mb = serialized_mb(full, [d.page_content for d in docs], [d.metadata for d in docs])
+    deduped_mb = serialized_mb(deduped, [docs[p].page_content for p in kept], [docs[p].metadata for p in kept])
+    print(f"{'':<10} {'vectors':>8} {'size MB':>8} {'build s':>8}")
+    print(f"{'full':<10} {len(vectors):>8} {full_mb:>8.2f} {full_time:>8.3f}")
+    print(f"{'deduped':<10} {len(kept):>8} {deduped_mb:>8.2f} {deduped_time + dedup_time:>8.3f}"
+          f"   ({stats['exact']} exact, {stats['near']} near duplicates; dedup pass {dedup_time:.2f}s)\n")
+
+    queries = make_queries(vectors, args.queries, args.noise)
+    # Ground truth: the first k distinct passages in the exact ranking of the full index
+    _, ranked = full.search(queries, min(len(vectors), args.max_k * 10))
+    print(f"{len(queries)} queries")
+    print(f"{'k':>3} | {'full dup slots':>14} {'misses':>7} | {'deduped dup slots':>17} {'misses':>7}")
+    for k in range(1, args.max_k + 1):
+        truth = []
+        for row in ranked:
+            distinct = list(dict.fromkeys(clusters[p] for p in row if p != -1))
+            truth.append(set(distinct[:k]))
+        full_dups, full_misses = evaluate(full, np.arange(len(vectors)), clusters, queries, truth, k)
+        dedup_dups, dedup_misses = evaluate(deduped, kept, clusters, queries, truth, k)
+        print(f"{k:>3} | {full_dups:>14.3f} {full_misses:>7.3f} | {dedup_dups:>17.3f} {dedup_misses:>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import time
+import argparse
+import faiss
+import numpy as np
+from vector_store import INDEX_TYPES, build_index
+
+# Compare ANN index types against the exact flat index in vector_db/:
+# recall@k, p50/p99 single-query latency and serialized index size.
+
+def make_queries(vectors, num_queries, noise, seed=0):
+    # Perturbed copies of stored chunks stand in for real questions, they land
+    # in the same regions of the embedding space without needing the model.
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(scale=noise, size=(len(picks), vectors.shape[1]))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.ascontiguousarray(queries, dtype="float32")
+
+def timed_search(index, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+def recall_at_k(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types on the vector_db embeddings")
+    parser.add_argument("--db-path", default="vector_db/index.faiss")
+    parser.add_argument("--types", nargs="+", default=INDEX_TYPES, choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.02)
+    args = parser.parse_args()
+
+    flat = faiss.read_index(args.db_path)
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    queries = make_queries(vectors, args.queries, args.noise)
+    truth, _ = timed_search(flat, queries, args.k)
+    print(f"{flat.ntotal} vectors, dim {flat.d}, {len(queries)} queries, k={args.k}\n")
+
+    print(f"{'type':<8} {'factory':<18} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'size MB':>8} {'build s':>8}")
+    for index_type in args.types:
+        start = time.perf_counter()
+        index, meta = build_index(vectors, index_type)
+        build_time = time.perf_counter() - start
+        found, latencies = timed_search(index, queries, args.k)
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        print(f"{index_type:<8} {meta['factory']:<18} {recall_at_k(truth, found):>9.3f} "
+              f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f} "
+              f"{size_mb:>8.2f} {build_time:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import numpy as np
+from outbound import Outbound, OutboundModel, http_client
+from benchmark_pipeline import QUESTIONS
+from voice_pipeline import LANGUAGES
+
+# Burst of concurrent sessions against a local stub provider that serves a TTS endpoint
+# and a streaming "LLM" endpoint, with fixed latency and a
+# concurrency limit above which it answers 429 like a rate-limited API. Compares direct
+# calls (new connection per request, no limit, no retries) with the outbound layer
+# (pooled client, single-flight, bounded concurrency, retry/backoff with a deadline).
+
+class StubProvider(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency_ms, chunk_ms, capacity):
+        super().__init__(address, StubHandler)
+        self.latency_ms = latency_ms
+        self.chunk_ms = chunk_ms
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.active = 0
+        self.counts = {"connections": 0, "tts": 0, "llm": 0, "rejected": 0}
+
+    def count(self, name, delta=1):
+        with self.lock:
+            self.counts[name] += delta
+
+    def handle_error(self, request, client_address):
+        # Clients closing idle keep-alive connections are expected here
+        pass
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            admitted = server.active < server.capacity
+            server.active += admitted
+        if not admitted:
+            server.count("rejected")
+            self.send(429, b'{"error": "rate limited"}')
+            return
+        try:
+            if self.path.endswith("/tts"):
+                server.count("tts")
+                self.tts(json.loads(body))
+            else:
+                server.count("llm")
+                self.llm(json.loads(body))
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def tts(self, payload):
+        time.sleep(self.server.latency_ms / 1000)
+        self.send(200, payload["text"].encode("utf-8"), "audio/mpeg")
+
+    def llm(self, payload):
+        # Streams the answer as newline-delimited JSON chunks
+        time.sleep(self.server.latency_ms / 1000)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = f"Answer to: {payload['prompt']}. It is given free at health centres.".split()
+        for i in range(0, len(words), 3):
+            time.sleep(self.server.chunk_ms / 1000)
+            line = (json.dumps({"text": " ".join(words[i:i + 3]) + " "}) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+def stub_tts(client, base_url, text, lang, timeout=None):
+    # Stands in for gTTS, whose requests can't be pointed at a local server
+    response = client.post(f"{base_url}/tts", json={"text": text, "lang": lang}, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+class HttpStubModel:
+    # genai.GenerativeModel-shaped client for the stub's streaming endpoint
+    def __init__(self, url, client):
+        self.url = url
+        self.client = client
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        timeout = (request_options or {}).get("timeout")
+        with self.client.stream("POST", self.url, json={"prompt": prompt}, timeout=timeout) as response:
+            response.raise_for_status()
+            chunks = [StubChunk(json.loads(line)["text"]) for line in response.iter_lines() if line]
+        return iter(chunks) if stream else StubChunk("".join(chunk.text for chunk in chunks))
+
+def run_burst(args, base_url, mode):
+    rng = random.Random(args.seed)
+    pool = [(lang, question) for lang, questions in sorted(QUESTIONS.items()) for question in questions[:args.questions]]
+    sessions = [rng.choice(pool) for _ in range(args.sessions)]
+    gemini = Outbound("gemini", max_concurrency=args.max_concurrency, backoff_seconds=args.backoff,
+                      deadline_seconds=args.deadline)
+    tts = Outbound("tts", max_concurrency=args.max_concurrency, backoff_seconds=args.backoff, deadline_seconds=args.deadline)
+    barrier = threading.Barrier(args.sessions)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def session(lang, question):
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            if mode == "direct":
+                # What each rerun did before: its own connections, no sharing, no retries
+                with httpx.Client() as client:
+                    answer = "".join(chunk.text for chunk in HttpStubModel(f"{base_url}/generate", client)
+                                     .generate_content(question, stream=True))
+                with httpx.Client() as client:
+                    stub_tts(client, base_url, answer, LANGUAGES[lang])
+            else:
+                model = OutboundModel(HttpStubModel(f"{base_url}/generate", http_client()), gemini)
+                answer = "".join(chunk.text for chunk in model.generate_content(question, stream=True))
+                tts.call(("gtts", answer, lang), lambda timeout: stub_tts(
+                    http_client(), base_url, answer, LANGUAGES[lang], timeout))
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=session, args=item) for item in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, gemini, tts
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the outbound call layer against a local stub provider")
+    parser.add_argument("--sessions", type=int, default=64, help="concurrent sessions in the burst")
+    parser.add_argument("--questions", type=int, default=2, help="distinct questions per language")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="stub time to first byte")
+    parser.add_argument("--chunk-ms", type=float, default=10.0, help="stub delay per streamed LLM chunk")
+    parser.add_argument("--capacity", type=int, default=16, help="concurrent requests before the stub answers 429")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="outbound slots per provider")
+    parser.add_argument("--backoff", type=float, default=0.1, help="first retry delay in seconds")
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubProvider(("127.0.0.1", 0), args.latency_ms, args.chunk_ms, args.capacity)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"{args.sessions} concurrent sessions, stub capacity {args.capacity}, {args.latency_ms:.0f} ms latency\n")
+
+    print(f"{'mode':<9} {'ok':>4} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'llm calls':>9} {'tts calls':>9} {'conns':>6} {'429s':>5}")
+    for mode in ("direct", "outbound"):
+        server.counts = dict.fromkeys(server.counts, 0)
+        latencies, errors, gemini, tts = run_burst(args, base_url, mode)
+        counts = server.counts
+        p = np.percentile(latencies, [50, 95, 99]) if latencies else [float("nan")] * 3
+        print(f"{mode:<9} {len(latencies):>4} {len(errors):>6} {p[0]:>8.1f} {p[1]:>8.1f} {p[2]:>8.1f} "
+              f"{counts['llm']:>9} {counts['tts']:>9} {counts['connections']:>6} {counts['rejected']:>5}")
+        if errors:
+            print(f"  first error: {errors[0]!r}")
+        if mode == "outbound":
+            for outbound in (gemini, tts):
+                stats = outbound.stats()
+                print(f"  {stats['name']:<7} requests {stats['requests']}, coalesced {stats['coalesced']}, "
+                      f"calls {stats['calls']}, retries {stats['retries']}, max queued {stats['max_queued']}, "
+                      f"queue wait p50/p95 {stats['queue_wait_p50_ms']:.1f}/{stats['queue_wait_p95_ms']:.1f} ms")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import numpy as np
+from semantic_cache import SemanticCache
+from tts_cache import AudioCache
+from context_builder import ContextBuilder
+from relevance_gate import RelevanceGate
+from streaming_tts import StubLLM, stub_tts
+from tracing import Tracer
+from voice_pipeline import VoicePipeline
+
+# Replays question sets in all 11 languages through the same VoicePipeline app.py uses,
+# with stub STT/LLM/TTS/embedding backends so it runs offline, and prints p50/p95/p99 per
+# stage. Save a baseline once with --save-baseline; runs with --baseline exit non-zero
+# when any stage's p95 got slower than the tolerance allows.
+
+QUESTIONS = {
+    "Hindi": ["खसरा का टीका कब दिया जाता है?", "यह टीका कहाँ मिलेगा?", "क्या विटामिन ए जरूरी है?", "आज मौसम कैसा है?"],
+    "English": ["When is the measles vaccine given?", "Where can I get this vaccine?", "Is vitamin A necessary for my child?",
+                "Who won the cricket match yesterday?"],
+    "Bengali": ["হামের টিকা কখন দেওয়া হয়?", "এই টিকা কোথায় পাওয়া যায়?", "ভিটামিন এ কি দরকার?", "আজ আবহাওয়া কেমন?"],
+    "Gujarati": ["ઓરીની રસી ક્યારે આપવામાં આવે છે?", "આ રસી ક્યાં મળશે?", "શું વિટામિન એ જરૂરી છે?", "આજે હવામાન કેવું છે?"],
+    "Kannada": ["ದಡಾರ ಲಸಿಕೆ ಯಾವಾಗ ನೀಡಲಾಗುತ್ತದೆ?", "ಈ ಲಸಿಕೆ ಎಲ್ಲಿ ಸಿಗುತ್ತದೆ?", "ವಿಟಮಿನ್ ಎ ಅಗತ್ಯವೇ?", "ಇಂದು ಹವಾಮಾನ ಹೇಗಿದೆ?"],
+    "Malayalam": ["അഞ്ചാംപനി വാക്സിൻ എപ്പോഴാണ് നൽകുന്നത്?", "ഈ വാക്സിൻ എവിടെ കിട്ടും?", "വിറ്റാമിൻ എ ആവശ്യമാണോ?",
+                  "ഇന്ന് കാലാവസ്ഥ എങ്ങനെ?"],
+    "Marathi": ["गोवरची लस कधी दिली जाते?", "ही लस कुठे मिळेल?", "विटामिन ए आवश्यक आहे का?", "आज हवामान कसे आहे?"],
+    "Tamil": ["தட்டம்மை தடுப்பூசி எப்போது போடப்படுகிறது?", "இந்த தடுப்பூசி எங்கே கிடைக்கும்?", "வைட்டமின் ஏ அவசியமா?",
+              "இன்று வானிலை எப்படி?"],
+    "Telugu": ["తట్టు టీకా ఎప్పుడు ఇస్తారు?", "ఈ టీకా ఎక్కడ దొరుకుతుంది?", "విటమిన్ ఎ అవసరమా?", "ఈరోజు వాతావరణం ఎలా ఉంది?"],
+    "Urdu": ["خسرہ کی ویکسین کب دی جاتی ہے؟", "یہ ویکسین کہاں ملے گی؟", "کیا وٹامن اے ضروری ہے؟", "آج موسم کیسا ہے؟"],
+    "Punjabi": ["ਖਸਰੇ ਦਾ ਟੀਕਾ ਕਦੋਂ ਲਗਾਇਆ ਜਾਂਦਾ ਹੈ?", "ਇਹ ਟੀਕਾ ਕਿੱਥੇ ਮਿਲੇਗਾ?", "ਕੀ ਵਿਟਾਮਿਨ ਏ ਜ਼ਰੂਰੀ ਹੈ?", "ਅੱਜ ਮੌਸਮ ਕਿਹੋ ਜਿਹਾ ਹੈ?"],
+}
+
+STUB_ANSWER = ("The measles-rubella vaccine is given at 9 to 12 months. A second dose is given at 16 to 24 months. "
+               "Both doses are free at government health centres. Carry the child's immunization card when you go.")
+
+def stub_embed(embed_ms, dim=384):
+    def embed(text):
+        time.sleep(embed_ms / 1000)
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=dim).astype("float32")
+        return vector / np.linalg.norm(vector)
+    return embed
+
+def stub_stt(stt_ms):
+    def transcribe(text):
+        time.sleep(stt_ms / 1000)
+        return text
+    return transcribe
+
+def run(args):
+    tracer = Tracer(args.trace_path)
+    synthesize = stub_tts(args.tts_ms_per_char / 1000)
+    tts_cache = AudioCache(synthesize=lambda text, lang, tld: synthesize(text))
+    embed = stub_embed(args.embed_ms)
+    pipeline = VoicePipeline(
+        lambda: StubLLM(STUB_ANSWER, token_delay=args.token_ms / 1000),
+        lambda text, lang_code: tts_cache.get(text, lang_code),
+        answer_cache=SemanticCache(embed),
+        relevance_gate=RelevanceGate(embed) if args.gate else None,
+        stream=not args.no_stream,
+    )
+    transcribe = stub_stt(args.stt_ms)
+    rng = random.Random(args.seed)
+    sources = {}
+    for conversation in range(args.conversations):
+        selected_lang = rng.choice(sorted(QUESTIONS))
+        context_builder = ContextBuilder()
+        for _ in range(args.turns):
+            with tracer.request("voice_turn", lang=selected_lang) as trace:
+                start = time.perf_counter()
+                raw_text = transcribe(rng.choice(QUESTIONS[selected_lang]))
+                trace.add_stage("stub_stt", (time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                context = context_builder.context()
+                trace.add_stage("build_context", (time.perf_counter() - start) * 1000)
+                result = pipeline.answer(raw_text, selected_lang, context)
+                trace.attrs["source"] = result.source
+                context_builder.append("user", raw_text)
+                context_builder.append("assistant", result.answer)
+            sources[result.source] = sources.get(result.source, 0) + 1
+    return tracer, sources
+
+def compare(summary, baseline, tolerance, slack_ms):
+    regressions = []
+    for name, stats in summary.items():
+        if name not in baseline:
+            continue
+        allowed = baseline[name]["p95"] * (1 + tolerance) + slack_ms
+        if stats["p95"] > allowed:
+            regressions.append(f"{name}: p95 {stats['p95']:.2f} ms > {allowed:.2f} ms "
+                               f"(baseline {baseline[name]['p95']:.2f} ms)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay multilingual voice turns through VoicePipeline with stub backends")
+    parser.add_argument("--conversations", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=5, help="turns per conversation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stt-ms", type=float, default=30.0)
+    parser.add_argument("--embed-ms", type=float, default=5.0)
+    parser.add_argument("--token-ms", type=float, default=20.0, help="delay per streamed LLM chunk")
+    parser.add_argument("--tts-ms-per-char", type=float, default=2.0)
+    parser.add_argument("--gate", action="store_true", help="enable the relevance gate (stub vectors make its scores random)")
+    parser.add_argument("--no-stream", action="store_true", help="generate the full answer before synthesizing speech")
+    parser.add_argument("--trace-path", help="also write every trace as a JSON line here")
+    parser.add_argument("--save-baseline", help="write the p50/p95/p99 summary to this JSON file")
+    parser.add_argument("--baseline", help="compare against a summary saved with --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 slowdown")
+    parser.add_argument("--slack-ms", type=float, default=1.0, help="allowed absolute p95 slowdown for very fast stages")
+    args = parser.parse_args()
+
+    tracer, sources = run(args)
+    print(tracer.format_summary())
+    print("answers by source: " + ", ".join(f"{source}={count}" for source, count in sorted(sources.items())))
+
+    summary = tracer.summary()
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(summary, json.load(f), args.tolerance, args.slack_ms)
+        if regressions:
+            print("p95 regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("no p95 regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+from rag_service import RagService, start_server
+from hybrid_retriever import BM25Index
+
+# Throughput of rag_service under N concurrent clients, offline: a stub embedding model
+# with a fixed per-call overhead (like a model forward pass) and a stub LLM with fixed
+# latency. Compares micro-batching against one query per batch.
+
+class StubEmbeddings(Embeddings):
+    def __init__(self, dim=384, call_ms=8.0, per_text_ms=0.3):
+        self.dim = dim
+        self.call_ms = call_ms
+        self.per_text_ms = per_text_ms
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=self.dim).astype("float32")
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep((self.call_ms + self.per_text_ms * len(texts)) / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class StubLLM:
+    def __init__(self, latency_ms=50.0):
+        self.latency_ms = latency_ms
+
+    def invoke(self, prompt):
+        time.sleep(self.latency_ms / 1000)
+        return f"stub answer ({len(prompt)} prompt chars)"
+
+def build_stub_db(num_chunks, embeddings):
+    texts = [f"chunk {i}: vaccine schedule note number {i}" for i in range(num_chunks)]
+    vectors = [embeddings._vector(text) for text in texts]
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=[{"page": i} for i in range(num_chunks)])
+
+async def post(host, port, path, payload):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+async def run_clients(host, port, path, clients, requests_per_client):
+    latencies = []
+
+    async def client(c):
+        for r in range(requests_per_client):
+            start = time.perf_counter()
+            await post(host, port, path, {"query": f"when is dose {c}-{r} given?"})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return time.perf_counter() - start, latencies
+
+async def benchmark(args, max_batch):
+    embeddings = StubEmbeddings()
+    database = build_stub_db(args.chunks, embeddings)
+    service = RagService(database, StubLLM(args.llm_ms), "Context: {context}\nQuestion: {question}",
+                         max_batch=max_batch, max_wait_ms=args.max_wait_ms,
+                         bm25=BM25Index.from_vectorstore(database) if args.hybrid else None)
+    server = await start_server(service, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    elapsed, latencies = await run_clients("127.0.0.1", port, args.path, args.clients, args.requests)
+    server.close()
+    await server.wait_closed()
+    await service.batcher.stop()
+    total = args.clients * args.requests
+    stats = service.stats()
+    print(f"max_batch={max_batch:<3} {total / elapsed:8.1f} req/s   p50 {np.percentile(latencies, 50):7.1f} ms   "
+          f"p99 {np.percentile(latencies, 99):7.1f} ms   avg batch {stats['avg_batch_size']:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rag_service micro-batching with stub models")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--path", default="/retrieve", choices=["/retrieve", "/answer"])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--llm-ms", type=float, default=50.0)
+    parser.add_argument("--hybrid", action="store_true", help="fuse with BM25 like the RAG chain's retriever")
+    args = parser.parse_args()
+
+    print(f"{args.clients} concurrent clients x {args.requests} requests on {args.path}")
+    for max_batch in (1, args.max_batch):
+        asyncio.run(benchmark(args, max_batch))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import random
+import argparse
+from langchain_huggingface import HuggingFaceEmbeddings
+from vector_store import load_vector_db
+from hybrid_retriever import BM25_FILE, BM25Index, HybridRetriever
+
+# Dense-only vs hybrid (BM25 + FAISS, RRF, overlap merging) retrieval on vector_db.
+# A query counts as answered at k when any retrieved chunk contains its needle text.
+# Reports recall, latency and "stuff" prompt size per k, then compares both retrievers
+# at equal recall.
+
+def sample_queries(database, num_queries, words=8, seed=0):
+    # Phrases lifted from random chunks stand in for questions about exact terms
+    rng = random.Random(seed)
+    doc_ids = list(database.index_to_docstore_id.values())
+    queries = []
+    while len(queries) < num_queries:
+        text = database.docstore.search(rng.choice(doc_ids)).page_content
+        tokens = text.split()
+        if len(tokens) < words * 2:
+            continue
+        start = rng.randrange(0, len(tokens) - words)
+        phrase = " ".join(tokens[start:start + words])
+        queries.append({"question": phrase, "answer_contains": phrase})
+    return queries
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+def evaluate(retrieve, queries):
+    found, latency, prompt_chars = 0, 0.0, 0
+    for query in queries:
+        start = time.perf_counter()
+        docs = retrieve(query["question"])
+        latency += time.perf_counter() - start
+        needle = normalize(query["answer_contains"])
+        found += any(needle in normalize(doc.page_content) for doc in docs)
+        prompt_chars += sum(len(doc.page_content) for doc in docs)
+    n = len(queries)
+    return {"recall": found / n, "ms": latency / n * 1000, "chars": prompt_chars / n}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense vs hybrid retrieval on vector_db")
+    parser.add_argument("--db-path", default="vector_db")
+    parser.add_argument("--queries", help="JSON list of {question, answer_contains}; default: sampled phrases")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--max-k", type=int, default=10)
+    parser.add_argument("--target-k", type=int, default=6, help="dense k whose recall the hybrid should match")
+    args = parser.parse_args()
+
+    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    database = load_vector_db(args.db_path, embedding_model)
+    if os.path.exists(os.path.join(args.db_path, BM25_FILE)):
+        bm25 = BM25Index.load(args.db_path)
+    else:
+        bm25 = BM25Index.from_vectorstore(database)
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = json.load(f)
+    else:
+        queries = sample_queries(database, args.num_queries)
+
+    results = {"dense": {}, "hybrid": {}}
+    print(f"{len(queries)} queries\n")
+    print(f"{'k':>3} | {'dense recall':>12} {'ms':>7} {'chars':>7} | {'hybrid recall':>13} {'ms':>7} {'chars':>7}")
+    for k in range(1, args.max_k + 1):
+        hybrid = HybridRetriever(vectorstore=database, bm25=bm25, k=k)
+        results["dense"][k] = evaluate(lambda q: database.similarity_search(q, k=k), queries)
+        results["hybrid"][k] = evaluate(hybrid.invoke, queries)
+        d, h = results["dense"][k], results["hybrid"][k]
+        print(f"{k:>3} | {d['recall']:>12.3f} {d['ms']:>7.2f} {d['chars']:>7.0f} | "
+              f"{h['recall']:>13.3f} {h['ms']:>7.2f} {h['chars']:>7.0f}")
+
+    target = results["dense"][args.target_k]
+    matching = [k for k, r in results["hybrid"].items() if r["recall"] >= target["recall"]]
+    if matching:
+        h = results["hybrid"][matching[0]]
+        print(f"\nDense k={args.target_k} recall {target['recall']:.3f}: {target['ms']:.2f} ms, {target['chars']:.0f} prompt chars")
+        print(f"Hybrid k={matching[0]} recall {h['recall']:.3f}: {h['ms']:.2f} ms, {h['chars']:.0f} prompt chars")
+    else:
+        print(f"\nHybrid never reached dense k={args.target_k} recall {target['recall']:.3f} up to k={args.max_k}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import textwrap
+from langchain_core.documents import Document
+from vector_store import INDEX_TYPES, load_vector_db
+from memory_for_llm import build_full, build_incremental
+from benchmark_rag_service import StubEmbeddings
+
+# Runs an incremental build that deletes, changes and adds PDFs for every index type and
+# checks that each stored chunk is still found by its own vector afterwards, i.e. that
+# the FAISS positions and LangChain's position -> docstore id map still line up.
+# Small generated PDFs and hashed stub embeddings keep it offline.
+
+WORDS = ("vaccine dose schedule measles rubella polio booster infant child mother clinic "
+         "vitamin supplement campaign district cold chain vial storage record card month "
+         "week birth injection oral drops fever reaction session outreach worker").split()
+
+def pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    # Minimal single-font PDF, enough for PyPDFLoader to extract the text again
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = " ".join(f"({pdf_escape(line)}) '" for line in textwrap.wrap(text, 90))
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("ascii") for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    with open(path, "wb") as f:
+        f.write(out)
+
+def make_pdf(path, seed, num_pages):
+    rng = random.Random(seed)
+    write_pdf(path, [" ".join(rng.choice(WORDS) for _ in range(300)) for _ in range(num_pages)])
+
+def self_lookup_rate(database, embeddings):
+    found = total = 0
+    for doc_id in database.index_to_docstore_id.values():
+        doc = database.docstore.search(doc_id)
+        results = database.similarity_search_by_vector(embeddings.embed_query(doc.page_content), k=1)
+        found += isinstance(results[0], Document) and results[0].page_content == doc.page_content
+        total += 1
+    return found / total
+
+def check(index_type, num_files, num_pages):
+    embeddings = StubEmbeddings(call_ms=0.0, per_text_ms=0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        data, path = os.path.join(tmp, "data"), os.path.join(tmp, "vector_db")
+        os.makedirs(data)
+        for i in range(num_files):
+            make_pdf(os.path.join(data, f"doc{i}.pdf"), i, num_pages)
+        build_full(data, path, embeddings, index_type, dedup_threshold=None)
+        os.remove(os.path.join(data, "doc0.pdf"))
+        make_pdf(os.path.join(data, "doc1.pdf"), 1000, num_pages)
+        make_pdf(os.path.join(data, f"doc{num_files}.pdf"), num_files, num_pages)
+        build_incremental(data, path, embeddings, dedup_threshold=None)
+        database = load_vector_db(path, embeddings)
+        return len(database.index_to_docstore_id), self_lookup_rate(database, embeddings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check incremental deletes for every FAISS index type")
+    parser.add_argument("--types", nargs="+", default=INDEX_TYPES, choices=INDEX_TYPES)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--min-rate", type=float, default=0.95, help="share of chunks that must find themselves")
+    args = parser.parse_args()
+
+    failed = []
+    results = {}
+    for index_type in args.types:
+        print(f"--- {index_type}")
+        results[index_type] = check(index_type, args.files, args.pages)
+    print(f"\n{'type':<8} {'vectors':>8} {'self-lookup':>12}")
+    for index_type, (vectors, rate) in results.items():
+        print(f"{index_type:<8} {vectors:>8} {rate:>12.3f}")
+        if rate < args.min_rate:
+            failed.append(index_type)
+    if failed:
+        print(f"positions and docstore ids out of line for: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import re
+import zlib
+import hashlib
+from collections import defaultdict
+import numpy as np
+
+# Exact and near-duplicate chunk detection for ingest. Guideline PDFs repeat schedule
+# tables and boilerplate across documents; instead of storing every copy as its own
+# vector, the first copy is kept as the canonical chunk and later copies only add their
+# source/page to its metadata. Near duplicates are found with MinHash over word
+# shingles and LSH banding, so each new chunk is compared to a handful of candidates
+# and nothing has to be embedded before the check.
+# Near-duplicate merging is opt-in (threshold < 1.0; the default 1.0 only merges exact
+# copies), and two chunks are never merged if their numbers differ: "16 to 24 months"
+# vs "12 to 15 months" or "0.5 ml" vs "1 ml" is a different fact, not a duplicate.
+
+PRIME = (1 << 31) - 1
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+def number_tokens(text):
+    return tuple(NUMBER_RE.findall(text))
+
+def shingles(text, size=5):
+    tokens = normalize_text(text).split()
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+class MinHasher:
+    def __init__(self, num_perm=64, shingle_size=5, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)),
+                             dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % PRIME).min(axis=1)
+
+def source_ref(metadata):
+    return {"source": metadata.get("source"), "page": metadata.get("page")}
+
+def merge_source(metadata, duplicate_metadata):
+    # The canonical chunk lists every (source, page) it stands for under "sources"
+    sources = metadata.setdefault("sources", [source_ref(metadata)])
+    ref = source_ref(duplicate_metadata)
+    if ref not in sources:
+        sources.append(ref)
+
+def drop_source(metadata, source):
+    # A file that contributed a duplicate is gone; the canonical chunk stays for the others
+    sources = [ref for ref in metadata.get("sources", [source_ref(metadata)]) if ref["source"] != source]
+    if sources and metadata.get("source") == source:
+        metadata["source"], metadata["page"] = sources[0]["source"], sources[0]["page"]
+    metadata["sources"] = sources
+
+class ChunkDeduplicator:
+    def __init__(self, threshold=1.0, num_perm=64, bands=16, shingle_size=5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.exact = {}
+        self.signatures = {}
+        self.numbers = {}
+        self.buckets = defaultdict(set)
+        self.stats = {"exact": 0, "near": 0}
+
+    @classmethod
+    def from_vectorstore(cls, database, **kwargs):
+        # Canonical chunks already in the index, so incremental ingests dedup against them
+        dedup = cls(**kwargs)
+        for doc_id in database.index_to_docstore_id.values():
+            dedup.add(doc_id, database.docstore.search(doc_id).page_content)
+        return dedup
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    @property
+    def near(self):
+        return self.threshold < 1.0
+
+    def find(self, text):
+        # Returns (canonical_id, "exact" | "near", signature); canonical_id is None for new text
+        digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+        if digest in self.exact:
+            return self.exact[digest], "exact", None
+        if not self.near:
+            return None, None, None
+        signature = self.hasher.signature(text)
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+        numbers = number_tokens(text)
+        best, best_score = None, self.threshold
+        for doc_id in candidates:
+            if self.numbers[doc_id] != numbers:
+                continue
+            score = float(np.mean(self.signatures[doc_id] == signature))
+            if score >= best_score:
+                best, best_score = doc_id, score
+        return best, "near" if best is not None else None, signature
+
+    def add(self, doc_id, text, signature=None):
+        digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+        self.exact.setdefault(digest, doc_id)
+        if not self.near:
+            return
+        self.numbers[doc_id] = number_tokens(text)
+        signature = self.hasher.signature(text) if signature is None else signature
+        self.signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets[key].add(doc_id)
+
+    def canonical(self, doc_id, text):
+        # Registers the chunk and returns None if it is new, else the id it duplicates
+        match, kind, signature = self.find(text)
+        if match is not None:
+            self.stats[kind] += 1
+            return match
+        self.add(doc_id, text, signature)
+        return None
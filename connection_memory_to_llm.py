@@ -1,11 +1,14 @@
 import os
+import uuid
 from dotenv import load_dotenv  # Add for local env support
 from langchain_huggingface import HuggingFaceEndpoint
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langgraph.checkpoint.memory import MemorySaver
+from vector_store import load_vector_db
+from hybrid_retriever import load_retriever
+from conversation_store import ConversationStore
+from tracing import TRACER, StageCallbackHandler
 from langgraph.graph import START, MessagesState, StateGraph
 
 # Load environment variables for local development
@@ -42,13 +45,13 @@ def set_custom_prompt(custom_prompt_template):
 # Load Database
 DB_PATH = "vector_db"
 embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-db = FAISS.load_local(DB_PATH, embedding_model, allow_dangerous_deserialization=True)
+db = load_vector_db(DB_PATH, embedding_model)
 
 # Create QA chain
 qa_chain = RetrievalQA.from_chain_type(
     llm=load_llm(HUGGINGFACE_REPO_ID),
     chain_type="stuff",
-    retriever=db.as_retriever(search_kwargs={'k': 3}),
+    retriever=load_retriever(db, DB_PATH, k=3),
     chain_type_kwargs={'prompt': set_custom_prompt(CUSTOM_PROMPT_TEMPLATE)}
 )
 
@@ -57,25 +60,39 @@ workflow = StateGraph(state_schema=MessagesState)
 
 def call_model(state: MessagesState):
     latest_message = state["messages"][-1].content if state["messages"] else ""
-    response = qa_chain.invoke({'query': latest_message})
+    # Writes embed/faiss_search/bm25_search/retrieval/prompt_build/llm timings per question (TRACE_PATH)
+    with TRACER.request("rag_chain"):
+        response = qa_chain.invoke({'query': latest_message}, config={"callbacks": [StageCallbackHandler()]})
     return {"messages": response["result"]}
 
 workflow.add_edge(START, "model")
 workflow.add_node("model", call_model)
 
-# Add memory to the graph
-memory = MemorySaver()
-app = workflow.compile(checkpointer=memory)
+app = workflow.compile()
 
 # Step 4: Run the conversational loop with memory
-config = {"configurable": {"thread_id": "1"}}
-print("Welcome to the Chatbot. Type 'quit' to exit.")
-while True:
-    user_query = input("Write your query: ")
-    if user_query.lower() == 'quit':
-        print("Chatbot: Goodbye!")
-        break
-    
-    events = app.stream({"messages": [{"role": "user", "content": user_query}]}, config=config)
-    for event in events:
-        print("Chatbot: ", event["model"]["messages"])
\ No newline at end of file
+def main():
+    # Add memory to the graph: a bounded window per thread in SQLite instead of an
+    # in-process MemorySaver that grows forever. Opened here, not at import, so modules
+    # that only reuse the chain (rag_service.py) don't create conversations.sqlite.
+    memory = ConversationStore(os.getenv("CONVERSATION_DB", "conversations.sqlite"))
+    # Set THREAD_ID to continue an earlier conversation
+    thread_id = os.getenv("THREAD_ID") or uuid.uuid4().hex
+    print(f"Welcome to the Chatbot (thread {thread_id}). Type 'quit' to exit.")
+    while True:
+        user_query = input("Write your query: ")
+        if user_query.lower() == 'quit':
+            print("Chatbot: Goodbye!")
+            if os.getenv("SHOW_TIMINGS") == "1":
+                print(TRACER.format_summary())
+            break
+
+        memory.append(thread_id, "user", user_query)
+        events = app.stream({"messages": memory.history(thread_id)})
+        for event in events:
+            answer = event["model"]["messages"]
+            memory.append(thread_id, "assistant", answer)
+            print("Chatbot: ", answer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import re
+from collections import deque
+
+VACCINATION_KEYWORDS = ["vacc", "टीक", "ভ্যাক", "વેક", "ವ್ಯಾಕ", "വാക്സ", "वैक्स", "వాక్స", "ویکس", "ਵੈਕ", "measles", "खसरा", "rubella", "रूबेला", "covid", "vitamin", "विटामिन"]
+FOLLOW_UP_KEYWORDS = ["where", "कहाँ", "online", "ऑनलाइन", "get", "पाएं", "this", "यह", "child", "बच्चा", "age", "उम्र", "portal", "पोर्टाल", "is", "क्या", "does", "दिया", "given", "supplement", "सप्लीमेंट", "necessary", "जरूरी"]
+REJECTION_PHRASES = ["केवल टीकाकरण से संबंधित", "Ask me only vaccination-related", "শুধুমাত্র ভ্যাকসিনেশন"]
+
+def build_context(history, max_messages=5):
+    # Reference implementation: rescans the window on every call. ContextBuilder below
+    # produces the same string incrementally (see benchmark_context.py).
+    context = ""
+    recent_history = history[-max_messages * 2:] if len(history) > max_messages * 2 else history
+    vaccination_keywords = VACCINATION_KEYWORDS
+    follow_up_keywords = FOLLOW_UP_KEYWORDS
+    rejection_phrases = REJECTION_PHRASES
+    is_vaccination_context = False
+    i = 0
+
+    while i < len(recent_history) - 1:
+        user_msg = recent_history[i]
+        ai_msg = recent_history[i + 1] if i + 1 < len(recent_history) else None
+
+        if user_msg['role'] == 'user' and ai_msg and ai_msg['role'] == 'assistant':
+            ai_content_lower = ai_msg['content'].lower()
+            if any(phrase in ai_content_lower for phrase in rejection_phrases):
+                i += 2
+                continue
+
+        user_content_lower = user_msg['content'].lower()
+        if any(keyword in user_content_lower for keyword in vaccination_keywords) or \
+           (is_vaccination_context and any(keyword in user_content_lower for keyword in follow_up_keywords)):
+            context += f"Question: {user_msg['content']}\n"
+            if ai_msg and ai_msg['role'] == 'assistant':
+                context += f"Answer: {ai_msg['content']}\n"
+            is_vaccination_context = True
+            i += 2
+        else:
+            is_vaccination_context = False
+            i += 1
+
+    return context.strip()
+
+def _alternation(words):
+    return "|".join(re.escape(word) for word in words)
+
+# One pass over the lowered text answers all three keyword questions: each optional
+# lookahead independently looks for a substring hit anywhere in the message.
+MESSAGE_MATCHER = re.compile(
+    rf"(?=(?P<vaccination>[\s\S]*?(?:{_alternation(VACCINATION_KEYWORDS)})))?"
+    rf"(?=(?P<follow_up>[\s\S]*?(?:{_alternation(FOLLOW_UP_KEYWORDS)})))?"
+    rf"(?=(?P<rejection>[\s\S]*?(?:{_alternation(REJECTION_PHRASES)})))?"
+)
+
+def classify(content):
+    # Patterns are matched against the lowered text exactly as build_context does
+    # ("Ask me only..." therefore never matches, same as before).
+    match = MESSAGE_MATCHER.match(content.lower())
+    return (match.group("vaccination") is not None,
+            match.group("follow_up") is not None,
+            match.group("rejection") is not None)
+
+def approx_tokens(text):
+    return len(text.split())
+
+class ContextBuilder:
+    # Keeps the last max_messages pairs already classified, so a turn costs one regex
+    # match when it is appended and building the context only walks boolean flags.
+    def __init__(self, max_messages=5, max_tokens=None):
+        self.max_tokens = max_tokens
+        self.window = deque(maxlen=max_messages * 2)
+        self._context = ""
+
+    @classmethod
+    def from_history(cls, history, max_messages=5, max_tokens=None):
+        builder = cls(max_messages, max_tokens)
+        for message in history[-max_messages * 2:]:
+            builder.append(message['role'], message['content'])
+        return builder
+
+    def append(self, role, content):
+        vaccination, follow_up, rejection = classify(content)
+        self.window.append((role, content, vaccination, follow_up, rejection))
+        self._context = self._build()
+
+    def _build(self):
+        window = self.window
+        blocks = []
+        is_vaccination_context = False
+        i = 0
+        while i < len(window) - 1:
+            user_role, user_content, vaccination, follow_up, _ = window[i]
+            ai_role, ai_content, _, _, ai_rejection = window[i + 1]
+            if user_role == 'user' and ai_role == 'assistant' and ai_rejection:
+                i += 2
+                continue
+            if vaccination or (is_vaccination_context and follow_up):
+                block = f"Question: {user_content}\n"
+                if ai_role == 'assistant':
+                    block += f"Answer: {ai_content}\n"
+                blocks.append(block)
+                is_vaccination_context = True
+                i += 2
+            else:
+                is_vaccination_context = False
+                i += 1
+
+        if self.max_tokens is not None:
+            # Drop the oldest question/answer blocks until the context fits the budget
+            total = sum(approx_tokens(block) for block in blocks)
+            while blocks and total > self.max_tokens:
+                total -= approx_tokens(blocks.pop(0))
+        return "".join(blocks).strip()
+
+    def context(self):
+        return self._context
@@ -0,0 +1,67 @@
+import time
+import sqlite3
+import threading
+
+# Conversation memory on local disk. Every thread (one CLI run or one Streamlit session)
+# keeps only its last `window` messages, and threads idle for longer than
+# `idle_ttl_seconds` are evicted, so memory and disk per active user stay flat no
+# matter how long the conversation runs.
+
+class ConversationStore:
+    def __init__(self, path="conversations.sqlite", window=20, idle_ttl_seconds=24 * 3600, evict_every=100):
+        self.window = window
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.evict_every = evict_every
+        self.appends = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, last_active REAL NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                              "thread_id TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS messages_thread ON messages (thread_id, id)")
+
+    def append(self, thread_id, role, content):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO messages (thread_id, role, content, created) VALUES (?, ?, ?, ?)",
+                              (thread_id, role, content, now))
+            self.conn.execute("INSERT INTO threads VALUES (?, ?) ON CONFLICT(thread_id) DO UPDATE SET last_active = ?",
+                              (thread_id, now, now))
+            # Sliding window: drop everything older than the last `window` messages
+            self.conn.execute("DELETE FROM messages WHERE thread_id = ? AND id <= (SELECT id FROM messages "
+                              "WHERE thread_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                              (thread_id, thread_id, self.window))
+            self.appends += 1
+        if self.appends % self.evict_every == 0:
+            self.evict_idle()
+
+    def history(self, thread_id, limit=None):
+        limit = min(limit or self.window, self.window)
+        with self.lock:
+            rows = self.conn.execute("SELECT role, content FROM messages WHERE thread_id = ? ORDER BY id DESC LIMIT ?",
+                                     (thread_id, limit)).fetchall()
+        return [{'role': role, 'content': content} for role, content in reversed(rows)]
+
+    def evict_idle(self, now=None):
+        cutoff = (now or time.time()) - self.idle_ttl_seconds
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM messages WHERE thread_id IN (SELECT thread_id FROM threads WHERE last_active < ?)",
+                              (cutoff,))
+            evicted = self.conn.execute("DELETE FROM threads WHERE last_active < ?", (cutoff,)).rowcount
+        return evicted
+
+    def delete_thread(self, thread_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM messages WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def stats(self):
+        with self.lock:
+            threads = self.conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+            messages = self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {"threads": threads, "messages": messages}
+
+    def close(self):
+        self.conn.close()
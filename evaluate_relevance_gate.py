@@ -0,0 +1,140 @@
+import os
+import argparse
+from langchain_huggingface import HuggingFaceEmbeddings
+from relevance_gate import RelevanceGate
+from vector_store import apply_search_params, load_index_meta, read_faiss_index
+
+# Offline evaluation of the local relevance gate on a labeled question set covering all
+# the app's languages. "Positive" = off-topic question the gate rejects; a false positive
+# is a real vaccination question that would wrongly get the rejection message.
+
+LABELED_QUESTIONS = [
+    # (language, question, is_vaccination_related)
+    ("English", "When is the measles vaccine given?", True),
+    ("English", "What injections does my newborn need?", True),
+    ("English", "Is it safe to get a flu shot while pregnant?", True),
+    ("English", "My baby has fever after the shot, is that normal?", True),
+    ("English", "Which immunizations are free at the government hospital?", True),
+    ("English", "When should my daughter get the HPV jab?", True),
+    ("English", "How many polio drops does a child need?", True),
+    ("English", "What is the BCG injection for?", True),
+    ("English", "Can adults get the hepatitis B shot?", True),
+    ("English", "What is the immunisation schedule for a 6 week old?", True),
+    ("English", "Where can I register for the covid booster?", True),
+    ("English", "Does the rotavirus dose cause diarrhoea?", True),
+    ("English", "My child missed the 10 week dose, what now?", True),
+    ("English", "Is the MR dose needed if the child had measles?", True),
+    ("English", "What is the DPT booster age?", True),
+    ("Hindi", "बच्चे को कौन से टीके लगते हैं?", True),
+    ("Hindi", "खसरा का टीका कब लगता है?", True),
+    ("English", "Do I need a tetanus shot after a cut?", True),
+    ("English", "How often is vitamin A given to kids?", True),
+    ("English", "Are there side effects of the pentavalent injection?", True),
+    ("English", "Who won the cricket match yesterday?", False),
+    ("English", "What is the weather like in Delhi today?", False),
+    ("English", "Tell me a joke", False),
+    ("English", "What is the capital of France?", False),
+    ("English", "How do I cook biryani?", False),
+    ("English", "Recommend a good Bollywood movie", False),
+    ("English", "What is the price of petrol in Mumbai?", False),
+    ("English", "How do I open a bank account?", False),
+    ("English", "Who is the prime minister of India?", False),
+    ("English", "Translate good morning into Tamil", False),
+    ("English", "What time does the train to Pune leave?", False),
+    ("English", "How can I improve my English speaking?", False),
+    ("English", "Write a poem about the monsoon", False),
+    ("English", "How many players are in a football team?", False),
+    ("English", "What is 25 times 17?", False),
+    ("Hindi", "आज का मौसम कैसा है?", False),
+    ("Hindi", "मुझे एक चुटकुला सुनाओ", False),
+    ("English", "Best phone under 20000 rupees?", False),
+    ("English", "How to fix a slow laptop?", False),
+    ("English", "What are the symptoms of a heart attack?", False),
+    ("Hindi", "नवजात शिशु को कौन से इंजेक्शन लगते हैं?", True),
+    ("Hindi", "पोलियो की खुराक कितनी बार दी जाती है?", True),
+    ("Hindi", "Bachche ko MR ka tika kab lagta hai?", True),
+    ("Hindi", "नौ महीने के बच्चे को कौन सी खुराक दी जाती है?", True),
+    ("Hindi", "Aaj cricket match kaun jeeta?", False),
+    ("Bengali", "শিশুকে হামের টিকা কখন দেওয়া হয়?", True),
+    ("Bengali", "নবজাতকের কোন কোন ইনজেকশন দরকার?", True),
+    ("Bengali", "নয় মাস বয়সে শিশুকে কোন ডোজ দিতে হয়?", True),
+    ("Bengali", "আজ কলকাতার আবহাওয়া কেমন?", False),
+    ("Bengali", "বিরিয়ানি কীভাবে রান্না করব?", False),
+    ("Gujarati", "બાળકને ઓરીની રસી ક્યારે આપવામાં આવે છે?", True),
+    ("Gujarati", "પોલિયોના ટીપાં કેટલી વાર આપવાના હોય?", True),
+    ("Gujarati", "આજે અમદાવાદમાં હવામાન કેવું છે?", False),
+    ("Gujarati", "મને એક સારી ફિલ્મ સૂચવો", False),
+    ("Kannada", "ಮಗುವಿಗೆ ದಡಾರ ಲಸಿಕೆ ಯಾವಾಗ ಕೊಡುತ್ತಾರೆ?", True),
+    ("Kannada", "ಹುಟ್ಟಿದ ಮಗುವಿಗೆ ಯಾವ ಚುಚ್ಚುಮದ್ದು ಬೇಕು?", True),
+    ("Kannada", "ಬೆಂಗಳೂರಿನಲ್ಲಿ ಇಂದು ಹವಾಮಾನ ಹೇಗಿದೆ?", False),
+    ("Kannada", "ನನಗೆ ಒಂದು ಜೋಕ್ ಹೇಳಿ", False),
+    ("Malayalam", "കുട്ടിക്ക് അഞ്ചാംപനി വാക്സിൻ എപ്പോഴാണ് നൽകുന്നത്?", True),
+    ("Malayalam", "നവജാത ശിശുവിന് ഏതൊക്കെ കുത്തിവെപ്പുകൾ വേണം?", True),
+    ("Malayalam", "ഇന്ന് കൊച്ചിയിലെ കാലാവസ്ഥ എങ്ങനെയുണ്ട്?", False),
+    ("Malayalam", "ബിരിയാണി എങ്ങനെ ഉണ്ടാക്കാം?", False),
+    ("Marathi", "बाळाला गोवरची लस कधी दिली जाते?", True),
+    ("Marathi", "पोलिओचे डोस किती वेळा द्यायचे?", True),
+    ("Marathi", "आज पुण्यात हवामान कसे आहे?", False),
+    ("Marathi", "मला एक विनोद सांगा", False),
+    ("Tamil", "குழந்தைக்கு தட்டம்மை தடுப்பூசி எப்போது போட வேண்டும்?", True),
+    ("Tamil", "பிறந்த குழந்தைக்கு என்ன ஊசிகள் போட வேண்டும்?", True),
+    ("Tamil", "ஒன்பதாவது மாதத்தில் குழந்தைக்கு என்ன டோஸ் கொடுக்க வேண்டும்?", True),
+    ("Tamil", "இன்று சென்னையில் வானிலை எப்படி?", False),
+    ("Tamil", "ஒரு நல்ல திரைப்படம் பரிந்துரைக்கவும்", False),
+    ("Telugu", "పిల్లలకు తట్టు టీకా ఎప్పుడు వేస్తారు?", True),
+    ("Telugu", "పోలియో చుక్కలు ఎన్ని సార్లు వేయాలి?", True),
+    ("Telugu", "ఈ రోజు హైదరాబాద్‌లో వాతావరణం ఎలా ఉంది?", False),
+    ("Telugu", "బిర్యానీ ఎలా చేయాలి?", False),
+    ("Urdu", "بچے کو خسرہ کا ٹیکہ کب لگتا ہے؟", True),
+    ("Urdu", "نوزائیدہ بچے کو کون سے ٹیکے لگتے ہیں؟", True),
+    ("Urdu", "آج دہلی میں موسم کیسا ہے؟", False),
+    ("Urdu", "مجھے ایک لطیفہ سناؤ", False),
+    ("Punjabi", "ਬੱਚੇ ਨੂੰ ਖਸਰੇ ਦਾ ਟੀਕਾ ਕਦੋਂ ਲੱਗਦਾ ਹੈ?", True),
+    ("Punjabi", "ਪੋਲੀਓ ਦੀਆਂ ਬੂੰਦਾਂ ਕਿੰਨੀ ਵਾਰ ਦੇਣੀਆਂ ਹਨ?", True),
+    ("Punjabi", "ਅੱਜ ਅੰਮ੍ਰਿਤਸਰ ਵਿੱਚ ਮੌਸਮ ਕਿਵੇਂ ਹੈ?", False),
+    ("Punjabi", "ਮੈਨੂੰ ਇੱਕ ਚੁਟਕਲਾ ਸੁਣਾਓ", False),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local relevance gate on labeled questions")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4])
+    parser.add_argument("--corpus", default="vector_db/index.faiss", help="FAISS index to score against ('' to skip)")
+    parser.add_argument("--reject-non-latin", action="store_true",
+                        help="also score Indic/Urdu-script questions instead of passing them to the LLM")
+    args = parser.parse_args()
+
+    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    corpus_index = None
+    if args.corpus and os.path.exists(args.corpus):
+        # Same nprobe/efSearch as the app applies from index_meta.json
+        corpus_index = read_faiss_index(args.corpus)
+        apply_search_params(corpus_index, load_index_meta(os.path.dirname(args.corpus)).get("params", {}))
+    gate = RelevanceGate(embedding_model.embed_query, corpus_index=corpus_index,
+                         embed_many=embedding_model.embed_documents, reject_non_latin=args.reject_non_latin)
+    questions = [question for _, question, _ in LABELED_QUESTIONS]
+    vectors = embedding_model.embed_documents(questions)
+    languages = list(dict.fromkeys(language for language, _, _ in LABELED_QUESTIONS))
+
+    print(f"{len(questions)} questions in {len(languages)} languages, corpus index: "
+          f"{'yes' if corpus_index is not None else 'no'}, non-Latin script scored: "
+          f"{'yes' if args.reject_non_latin else 'no'}\n")
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'false rej':>9} {'LLM calls saved':>15}  false rejections")
+    for threshold in args.thresholds:
+        gate.threshold = threshold
+        true_pos = false_pos = false_neg = 0
+        false_by_language = dict.fromkeys(languages, 0)
+        for (language, question, related), vector in zip(LABELED_QUESTIONS, vectors):
+            rejected = not gate.check(question, vector=vector).relevant
+            true_pos += rejected and not related
+            false_pos += rejected and related
+            false_neg += not rejected and not related
+            false_by_language[language] += rejected and related
+        rejected_total = true_pos + false_pos
+        precision = true_pos / rejected_total if rejected_total else 1.0
+        recall = true_pos / (true_pos + false_neg) if true_pos + false_neg else 0.0
+        by_language = ", ".join(f"{language} {count}" for language, count in false_by_language.items() if count)
+        print(f"{threshold:>9.2f} {precision:>9.2f} {recall:>7.2f} {false_pos:>9d} "
+              f"{rejected_total / len(questions):>14.0%}  {by_language or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Any, List
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from tracing import stage
+
+# Hybrid retrieval: a BM25 inverted index (vector_db/bm25.json, built by memory_for_llm.py)
+# catches exact terms like "MR", "DPT" or "9 months" that dense search misses, and the two
+# rankings are fused by reciprocal rank. Chunks that overlap (the splitter keeps 50
+# characters between neighbours) are stitched together and near-copies dropped, so a
+# small k fills the "stuff" prompt with distinct text.
+
+BM25_FILE = "bm25.json"
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    def __init__(self, doc_ids, doc_lens, postings, k1=1.5, b=0.75):
+        self.doc_ids = doc_ids
+        self.doc_lens = doc_lens
+        self.postings = postings  # term -> [[doc index, term frequency], ...]
+        self.k1 = k1
+        self.b = b
+        self.avgdl = sum(doc_lens) / len(doc_lens) if doc_lens else 0.0
+        num_docs = len(doc_ids)
+        self.idf = {term: math.log(1 + (num_docs - len(p) + 0.5) / (len(p) + 0.5)) for term, p in postings.items()}
+
+    @classmethod
+    def build(cls, doc_ids, texts):
+        postings = defaultdict(list)
+        doc_lens = []
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append([i, tf])
+        return cls(list(doc_ids), doc_lens, dict(postings))
+
+    @classmethod
+    def from_vectorstore(cls, database):
+        doc_ids = [doc_id for _, doc_id in sorted(database.index_to_docstore_id.items())]
+        texts = [database.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return cls.build(doc_ids, texts)
+
+    def save(self, path):
+        tmp_file = os.path.join(path, BM25_FILE + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"doc_ids": self.doc_ids, "doc_lens": self.doc_lens, "postings": self.postings}, f, ensure_ascii=False)
+        os.replace(tmp_file, os.path.join(path, BM25_FILE))
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, BM25_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["doc_ids"], data["doc_lens"], data["postings"])
+
+    def search(self, query, k):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[i] / self.avgdl)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[i], score) for i, score in best]
+
+def dense_search(database, query, k):
+    with stage("embed"):
+        vector = np.asarray([database.embedding_function.embed_query(query)], dtype="float32")
+    with stage("faiss_search"):
+        _, positions = database.index.search(vector, k)
+    return [database.index_to_docstore_id[int(p)] for p in positions[0] if p != -1]
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def stitch(a, b, min_overlap=20, max_overlap=80):
+    # Returns a+b without the shared overlap if b continues a, else None
+    for n in range(min(max_overlap, len(a), len(b)), min_overlap - 1, -1):
+        if a.endswith(b[:n]):
+            return a + b[n:]
+    return None
+
+def jaccard(a, b):
+    a, b = set(tokenize(a)), set(tokenize(b))
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def merge_overlapping(docs, k, near_duplicate=0.8):
+    selected = []
+    for doc in docs:
+        merged = False
+        for i, kept in enumerate(selected):
+            if kept.metadata.get("source") == doc.metadata.get("source"):
+                text = stitch(kept.page_content, doc.page_content) or stitch(doc.page_content, kept.page_content)
+                if text:
+                    selected[i] = Document(page_content=text, metadata=kept.metadata)
+                    merged = True
+                    break
+            if jaccard(kept.page_content, doc.page_content) >= near_duplicate:
+                merged = True
+                break
+        if not merged:
+            if len(selected) >= k:
+                break
+            selected.append(doc)
+    return selected
+
+class HybridRetriever(BaseRetriever):
+    vectorstore: Any
+    bm25: Any
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        dense = dense_search(self.vectorstore, query, self.fetch_k)
+        return hybrid_fuse(self.vectorstore, self.bm25, query, dense, self.k, self.fetch_k, self.rrf_k)
+
+class DenseRetriever(BaseRetriever):
+    # Dense-only search through dense_search, so it is traced like the hybrid path
+    vectorstore: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        docs = (self.vectorstore.docstore.search(doc_id) for doc_id in dense_search(self.vectorstore, query, self.k))
+        return [doc for doc in docs if isinstance(doc, Document)]
+
+def hybrid_fuse(database, bm25, query, dense, k, fetch_k=20, rrf_k=60):
+    # BM25 side, fusion and merging for a dense ranking (docstore ids) computed elsewhere,
+    # e.g. by rag_service.py for a whole batch of queries at once
+    with stage("bm25_search"):
+        sparse = [doc_id for doc_id, _ in bm25.search(query, fetch_k)]
+    fused = reciprocal_rank_fusion([dense, sparse], rrf_k)
+    docs = (database.docstore.search(doc_id) for doc_id in fused)
+    return merge_overlapping((doc for doc in docs if isinstance(doc, Document)), k)
+
+def load_bm25(path):
+    # None for indexes built before bm25.json existed
+    if os.path.exists(os.path.join(path, BM25_FILE)):
+        return BM25Index.load(path)
+    return None
+
+def load_retriever(database, path, k=3):
+    # Falls back to dense-only search for indexes built before bm25.json existed
+    bm25 = load_bm25(path)
+    if bm25 is not None:
+        return HybridRetriever(vectorstore=database, bm25=bm25, k=k)
+    return DenseRetriever(vectorstore=database, k=k)
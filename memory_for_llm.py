@@ -1,36 +1,306 @@
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+import os
+import json
+import argparse
+import glob
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from vector_store import (DOCSTORE_BACKENDS, IN_PLACE_DELETE_TYPES, INDEX_TYPES, SEARCH_PARAMS, convert_index,
+                          load_index_meta, load_vector_db, save_index_meta, save_vector_db)
+from hybrid_retriever import BM25Index
+from chunk_dedup import ChunkDeduplicator, drop_source, merge_source
 
 # Step1: Load raw Pdf(s)
 Data_Path="data/"
-def load_pdf_files(data):
-    loader=DirectoryLoader(data,
-                           glob='*.pdf',
-                           loader_cls=PyPDFLoader)
-    documents=loader.load()
-    return documents
-
-documents=load_pdf_files(data=Data_Path)
-#print("length of pfd file: ",len(documents))
 
 # Step2: Create Chunks
 def create_chunks(extracted_data):
    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
    chunks = text_splitter.split_documents(extracted_data)
    return chunks
-num_chunks=create_chunks(documents)
-#print(len(num_chunks))
 
 # Step3: Create Vector Embeddings
 def get_embedding_model():
     embedding_model=HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
     return embedding_model
-embedding_model=get_embedding_model()
-
 
 # Step 4: Store embeddings in FAISS
 db_path="vector_db/"
-database=FAISS.from_documents(num_chunks,embedding_model)
-database.save_local(db_path)
\ No newline at end of file
+MANIFEST_FILE="manifest.json"
+
+# Incremental ingest: the manifest keeps a content hash per PDF and the ids of the
+# chunks it produced, so only new/changed files get re-embedded and removed files
+# get their vectors deleted.
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def chunk_ids(path, digest, chunks):
+    # The path is part of the id so copies of one PDF under different names don't collide
+    prefix = hashlib.sha256(f"{os.path.normpath(path)}\0{digest}".encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}-{i}" for i in range(len(chunks))]
+
+def load_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+def chunk_file(path, digest=None):
+    # Runs inside the worker processes: parse + split one PDF.
+    digest = digest or file_hash(path)
+    pages = PyPDFLoader(path).load()
+    chunks = create_chunks(pages)
+    return path, digest, len(pages), chunks, chunk_ids(path, digest, chunks)
+
+# Exact duplicate chunks keep a single vector. A threshold below 1.0 also merges near
+# duplicates (MinHash similarity >= threshold, same numbers); see chunk_dedup.py
+DEDUP_THRESHOLD=1.0
+
+# Streaming ingest: PDFs are parsed in a process pool, chunks flow through a generator
+# into fixed-size embedding batches that are appended to the index as they finish.
+# Only max_workers * 2 files are in flight at once, so memory stays bounded.
+EMBED_BATCH_SIZE=256
+
+def stream_parsed_files(pdfs, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = iter(pdfs)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = set()
+        for pdf in pending:
+            in_flight.add(pool.submit(chunk_file, pdf))
+            if len(in_flight) >= max_workers * 2:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_pdf = next(pending, None)
+                if next_pdf is not None:
+                    in_flight.add(pool.submit(chunk_file, next_pdf))
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ingest(pdfs, embedding_model, database=None, manifest_files=None, batch_size=EMBED_BATCH_SIZE, dedup=None):
+    # With a ChunkDeduplicator, duplicate chunks are not embedded; their source/page is
+    # merged into the canonical chunk and the manifest points the file at its id.
+    stats = {"files": 0, "pages": 0, "chunks": 0, "duplicates": 0}
+    pending = {}  # metadata of chunks yielded but not yet added to the index
+
+    def merge_duplicate(canonical_id, chunk):
+        metadata = pending.get(canonical_id)
+        if metadata is None:
+            metadata = database.docstore.search(canonical_id).metadata
+        merge_source(metadata, chunk.metadata)
+        stats["duplicates"] += 1
+
+    def chunk_stream():
+        for path, digest, num_pages, chunks, ids in stream_parsed_files(pdfs):
+            file_ids = []
+            for chunk, cid in zip(chunks, ids):
+                canonical_id = dedup.canonical(cid, chunk.page_content) if dedup is not None else None
+                if canonical_id is not None:
+                    merge_duplicate(canonical_id, chunk)
+                    cid = canonical_id
+                else:
+                    pending[cid] = chunk.metadata
+                    yield chunk, cid
+                if cid not in file_ids:
+                    file_ids.append(cid)
+            if manifest_files is not None:
+                manifest_files[path] = {"sha256": digest, "chunk_ids": file_ids}
+            stats["files"] += 1
+            stats["pages"] += num_pages
+
+    start = time.perf_counter()
+    for batch in batched(chunk_stream(), batch_size):
+        texts = [chunk.page_content for chunk, _ in batch]
+        metadatas = [chunk.metadata for chunk, _ in batch]
+        ids = [cid for _, cid in batch]
+        vectors = embedding_model.embed_documents(texts)
+        if database is None:
+            database = FAISS.from_embeddings(list(zip(texts, vectors)), embedding_model, metadatas=metadatas, ids=ids)
+        else:
+            database.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        for cid in ids:
+            pending.pop(cid, None)
+        stats["chunks"] += len(batch)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Ingested {stats['files']} files: {stats['pages'] / elapsed:.1f} pages/s, "
+          f"{stats['chunks'] / elapsed:.1f} chunks/s ({elapsed:.1f}s)")
+    if dedup is not None:
+        print(f"Merged {stats['duplicates']} duplicate chunks ({dedup.stats['exact']} exact, {dedup.stats['near']} near)")
+    return database, stats
+
+def save_database(database, path, index_type="flat", index_params=None, docstore="pickle", dedup_threshold=None):
+    # Chunks are streamed into an exact flat index; ANN indexes are trained on the
+    # full set of vectors afterwards and the training params go into index_meta.json.
+    meta = {"index_type": "flat", "factory": "Flat", "params": {}, "build_params": {}, "ntotal": int(database.index.ntotal)}
+    if index_type != "flat":
+        start = time.perf_counter()
+        database, meta = convert_index(database, index_type, index_params)
+        print(f"Built {meta['factory']} index in {time.perf_counter() - start:.1f}s")
+    save_vector_db(database, path, docstore)
+    save_index_meta(path, {**meta, "docstore": docstore, "dedup_threshold": dedup_threshold})
+    # Sparse BM25 index over the same chunks for hybrid retrieval
+    BM25Index.from_vectorstore(database).save(path)
+    return database
+
+def index_size_mb(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in ("index.faiss", "index.pkl", "docstore.sqlite")
+               if os.path.exists(os.path.join(path, name))) / 1e6
+
+def build_full(data, path, embedding_model, index_type="flat", index_params=None, docstore="pickle",
+               dedup_threshold=DEDUP_THRESHOLD):
+    start = time.perf_counter()
+    manifest = {"version": 1, "files": {}}
+    pdfs = sorted(glob.glob(os.path.join(data, "*.pdf")))
+    dedup = ChunkDeduplicator(dedup_threshold) if dedup_threshold else None
+    database, stats = ingest(pdfs, embedding_model, manifest_files=manifest["files"], dedup=dedup)
+    if database is None:
+        raise ValueError(f"No PDF chunks found in {data}")
+    database = save_database(database, path, index_type, index_params, docstore, dedup_threshold)
+    save_manifest(path, manifest)
+    # Run once with --no-dedup to compare vectors, size and build time against deduplicated
+    print(f"Full build: {stats['files']} files, {stats['chunks'] + stats['duplicates']} chunks -> "
+          f"{stats['chunks']} vectors ({stats['duplicates']} duplicates merged), "
+          f"{index_size_mb(path):.1f} MB on disk, {time.perf_counter() - start:.1f}s")
+    return database
+
+def previous_params(meta, index_type):
+    # Params of the current index (explicit build params plus search params), so a rebuild
+    # of the same type keeps them unless they are overridden
+    if index_type != meta["index_type"]:
+        return {}
+    params = meta.get("params", {})
+    return {**meta.get("build_params", {}), **{key: params[key] for key in SEARCH_PARAMS if key in params}}
+
+def build_incremental(data, path, embedding_model, index_type=None, index_params=None, docstore=None,
+                      dedup_threshold=DEDUP_THRESHOLD):
+    manifest = load_manifest(path)
+    meta = load_index_meta(path)
+    index_type = index_type or meta["index_type"]
+    docstore = docstore or meta.get("docstore", "pickle")
+    params = {**previous_params(meta, index_type), **(index_params or {})}
+    build_params = {key: value for key, value in params.items() if key not in SEARCH_PARAMS}
+    if manifest is None or not os.path.exists(os.path.join(path, "index.faiss")):
+        # An index without a manifest can't be attributed to files, rebuild it once.
+        return build_full(data, path, embedding_model, index_type, params, docstore, dedup_threshold)
+    if index_type != meta["index_type"] or build_params != meta.get("build_params", {}):
+        print(f"Index type/build params changed ({meta['index_type']} -> {index_type}), rebuilding")
+        return build_full(data, path, embedding_model, index_type, params, docstore, dedup_threshold)
+    if dedup_threshold != meta.get("dedup_threshold"):
+        # Indexes built before (or without) dedup still hold every duplicate
+        print(f"Dedup threshold changed ({meta.get('dedup_threshold')} -> {dedup_threshold}), rebuilding")
+        return build_full(data, path, embedding_model, index_type, params, docstore, dedup_threshold)
+    # nprobe/ef_search only change how the loaded index is searched
+    search_params = {**meta.get("params", {}), **{key: params[key] for key in SEARCH_PARAMS if key in params}}
+
+    database = load_vector_db(path, embedding_model, writable=True)
+    current = {pdf: file_hash(pdf) for pdf in sorted(glob.glob(os.path.join(data, "*.pdf")))}
+    known = manifest["files"]
+
+    removed = [pdf for pdf in known if pdf not in current]
+    changed = [pdf for pdf, digest in current.items() if pdf in known and known[pdf]["sha256"] != digest]
+    added = [pdf for pdf in current if pdf not in known]
+
+    # A deduplicated chunk is shared by every file that produced a copy of it; it is only
+    # deleted once none of the remaining files refer to it
+    outdated = removed + changed
+    still_used = {cid for pdf, entry in known.items() if pdf not in outdated for cid in entry["chunk_ids"]}
+    stale_ids = list(dict.fromkeys(cid for pdf in outdated for cid in known[pdf]["chunk_ids"] if cid not in still_used))
+    if stale_ids and index_type not in IN_PLACE_DELETE_TYPES:
+        print(f"{index_type} index can't delete vectors in place, rebuilding")
+        return build_full(data, path, embedding_model, index_type, params, docstore, dedup_threshold)
+    if stale_ids:
+        database.delete(stale_ids)
+    shared_ids = {cid for pdf in outdated for cid in known[pdf]["chunk_ids"] if cid in still_used}
+    for pdf in outdated:
+        for cid in shared_ids.intersection(known[pdf]["chunk_ids"]):
+            drop_source(database.docstore.search(cid).metadata, pdf)
+    for pdf in removed:
+        del known[pdf]
+
+    dedup = ChunkDeduplicator.from_vectorstore(database, threshold=dedup_threshold) if dedup_threshold else None
+    database, stats = ingest(changed + added, embedding_model, database=database, manifest_files=known, dedup=dedup)
+    new_chunks = stats["chunks"]
+
+    if stale_ids or shared_ids or new_chunks or stats["duplicates"] or docstore != meta.get("docstore", "pickle"):
+        # New vectors go into the already trained index; run with --full to retrain
+        # IVF/PQ centroids once the corpus has drifted a lot.
+        save_vector_db(database, path, docstore)
+        save_index_meta(path, {**meta, "params": search_params, "ntotal": int(database.index.ntotal),
+                               "docstore": docstore})
+        BM25Index.from_vectorstore(database).save(path)
+        save_manifest(path, manifest)
+    elif search_params != meta.get("params", {}):
+        save_index_meta(path, {**meta, "params": search_params})
+        print(f"Search params updated: {', '.join(f'{key}={search_params[key]}' for key in SEARCH_PARAMS if key in search_params)}")
+    print(f"Incremental build: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+          f"{new_chunks} chunks embedded, {stats['duplicates']} duplicates merged, {len(stale_ids)} vectors deleted")
+    return database
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the vector_db FAISS index from data/*.pdf")
+    parser.add_argument("--full", action="store_true", help="rebuild everything instead of an incremental update")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="FAISS index type (default: keep the current one, else flat)")
+    parser.add_argument("--nlist", type=int, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, help="IVF clusters searched per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree")
+    parser.add_argument("--ef-search", type=int, help="HNSW search depth")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers")
+    parser.add_argument("--docstore", choices=DOCSTORE_BACKENDS, help="chunk store backend (default: keep the current one, else pickle)")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="MinHash similarity above which chunks are merged into one vector "
+                             "(default: keep the current one, else 1.0: exact duplicates only)")
+    parser.add_argument("--no-dedup", action="store_true", help="keep every duplicate chunk as its own vector")
+    args = parser.parse_args()
+    meta = load_index_meta(db_path)
+    if args.no_dedup:
+        dedup_threshold = None
+    elif args.dedup_threshold is not None:
+        dedup_threshold = args.dedup_threshold
+    else:
+        # Like --index-type and --docstore: keep what the index was built with (None = --no-dedup)
+        dedup_threshold = meta.get("dedup_threshold", DEDUP_THRESHOLD)
+    index_params = {key: value for key, value in {
+        "nlist": args.nlist, "nprobe": args.nprobe, "hnsw_m": args.hnsw_m,
+        "ef_search": args.ef_search, "pq_m": args.pq_m,
+    }.items() if value is not None}
+
+    embedding_model=get_embedding_model()
+    if args.full:
+        index_type = args.index_type or meta["index_type"]
+        docstore = args.docstore or meta.get("docstore", "pickle")
+        index_params = {**previous_params(meta, index_type), **index_params}
+        build_full(Data_Path, db_path, embedding_model, index_type, index_params, docstore, dedup_threshold)
+    else:
+        build_incremental(Data_Path, db_path, embedding_model, args.index_type, index_params, args.docstore,
+                          dedup_threshold)
+
+if __name__ == "__main__":
+    main()
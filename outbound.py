@@ -0,0 +1,275 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future
+import httpx
+from gtts.tts import gTTSError
+from tracing import current_trace, percentile
+
+# Shared outbound-call layer for Gemini and gTTS. Every provider gets one process-wide
+# Outbound gate that all Streamlit sessions go through:
+#   - single-flight: identical in-flight requests (same key) share one upstream call,
+#     streams included: a stream is drained by a thread of the gate and every caller,
+#     the first one too, replays its chunks, so a caller that stops early (a Streamlit
+#     rerun, a failing TTS call) doesn't cut the stream off for the others
+#   - a concurrency bound with queueing metrics, so bursts wait here instead of
+#     running into provider rate limits
+#   - retries with jittered exponential backoff, all inside one deadline that also
+#     covers the time spent queueing
+# Our own HTTP calls (e.g. the RAG service) reuse connections through the shared client
+# from http_client(); gTTS and the Gemini SDK keep their own transports.
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+def is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, gTTSError):
+        # gTTS keeps the failed response as `rsp`; None means the request itself failed
+        return error.rsp is None or error.rsp.status_code in RETRYABLE_STATUS
+    # google.api_core errors carry the HTTP status as `code` (429 ResourceExhausted, 503 ...)
+    return getattr(error, "code", None) in RETRYABLE_STATUS
+
+_client = None
+_client_lock = threading.Lock()
+
+def http_client():
+    # One pooled client per process; keep-alive connections are reused across sessions
+    global _client
+    with _client_lock:
+        if _client is None:
+            max_connections = int(os.getenv("OUTBOUND_MAX_CONNECTIONS", "20"))
+            _client = httpx.Client(limits=httpx.Limits(max_connections=max_connections,
+                                                       max_keepalive_connections=max_connections),
+                                   timeout=httpx.Timeout(float(os.getenv("OUTBOUND_TIMEOUT", "15"))))
+        return _client
+
+class _Broadcast:
+    # Chunks of one in-flight stream, replayed to every caller that joined it
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, item):
+        with self.cond:
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def close(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def replay(self, deadline):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.items) and not self.done:
+                    if not self.cond.wait(timeout=max(deadline - time.monotonic(), 0)):
+                        raise DeadlineExceeded("waiting for a shared stream")
+                if i < len(self.items):
+                    item = self.items[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield item
+
+class Outbound:
+    def __init__(self, name, max_concurrency=8, max_attempts=3, backoff_seconds=0.5, max_backoff_seconds=8.0,
+                 deadline_seconds=30.0, retryable=is_retryable):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.deadline_seconds = deadline_seconds
+        self.retryable = retryable
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.flights = {}   # key -> Future of the in-flight call
+        self.streams = {}   # key -> _Broadcast of the in-flight stream
+        self.queue_wait_ms = deque(maxlen=10000)
+        self.counts = {"requests": 0, "coalesced": 0, "calls": 0, "retries": 0, "failures": 0,
+                       "deadline_exceeded": 0}
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _deadline(self, deadline_seconds):
+        return time.monotonic() + (deadline_seconds or self.deadline_seconds)
+
+    def _acquire(self, deadline):
+        start = time.monotonic()
+        with self.lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        acquired = self.semaphore.acquire(timeout=max(deadline - start, 0))
+        wait_ms = (time.monotonic() - start) * 1000
+        with self.lock:
+            self.queued -= 1
+            self.queue_wait_ms.append(wait_ms)
+            if acquired:
+                self.active += 1
+        trace = current_trace()
+        if trace is not None:
+            trace.add_stage(f"{self.name}_queue", wait_ms)
+        if not acquired:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"{self.name}: no free slot before the deadline")
+
+    def _release(self):
+        with self.lock:
+            self.active -= 1
+        self.semaphore.release()
+
+    def _remaining(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"{self.name}: deadline exceeded")
+        return remaining
+
+    def _backoff(self, error, attempt, deadline):
+        # Sleeps before the next attempt and returns True, or False if the error is final.
+        # The slot stays taken while sleeping so a rate-limited provider sees less load.
+        if attempt >= self.max_attempts or not self.retryable(error):
+            return False
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        if time.monotonic() + delay >= deadline:
+            return False
+        self._count("retries")
+        time.sleep(delay)
+        return True
+
+    def _run(self, fn, deadline):
+        self._acquire(deadline)
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                remaining = self._remaining(deadline)
+                self._count("calls")
+                try:
+                    return fn(remaining)
+                except Exception as e:
+                    if not self._backoff(e, attempt, deadline):
+                        self._count("failures")
+                        raise
+        finally:
+            self._release()
+
+    def call(self, key, fn, deadline_seconds=None):
+        # fn(timeout_seconds) does the upstream request; callers with the same key share it
+        deadline = self._deadline(deadline_seconds)
+        self._count("requests")
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Future()
+            else:
+                self.counts["coalesced"] += 1
+        if not leader:
+            try:
+                return flight.result(timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                if flight.done():
+                    raise
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded(f"{self.name}: waiting for a shared call") from None
+        try:
+            result = self._run(fn, deadline)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+
+    def stream(self, key, make_iter, deadline_seconds=None):
+        # make_iter(timeout_seconds) opens the upstream stream; returns an iterator of its chunks
+        deadline = self._deadline(deadline_seconds)
+        self._count("requests")
+        with self.lock:
+            broadcast = self.streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self.streams[key] = _Broadcast()
+            else:
+                self.counts["coalesced"] += 1
+        if leader:
+            # The caller's context goes along so queue time still lands in its trace
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._drain_stream, key, make_iter, broadcast, deadline), daemon=True).start()
+        return broadcast.replay(deadline)
+
+    def _drain_stream(self, key, make_iter, broadcast, deadline):
+        try:
+            self._acquire(deadline)
+            try:
+                for attempt in range(1, self.max_attempts + 1):
+                    remaining = self._remaining(deadline)
+                    self._count("calls")
+                    started = False
+                    try:
+                        for item in make_iter(remaining):
+                            started = True
+                            broadcast.publish(item)
+                        break
+                    except Exception as e:
+                        # Chunks already handed out can't be taken back, only retry before the first
+                        if started or not self._backoff(e, attempt, deadline):
+                            self._count("failures")
+                            raise
+            finally:
+                self._release()
+            broadcast.close()
+        except BaseException as e:
+            broadcast.close(e)
+        finally:
+            with self.lock:
+                if self.streams.get(key) is broadcast:
+                    del self.streams[key]
+
+    def stats(self):
+        with self.lock:
+            waits = list(self.queue_wait_ms)
+            return {"name": self.name, **self.counts, "active": self.active, "queued": self.queued,
+                    "max_queued": self.max_queued, "queue_wait_p50_ms": percentile(waits, 50),
+                    "queue_wait_p95_ms": percentile(waits, 95), "queue_wait_p99_ms": percentile(waits, 99)}
+
+class OutboundModel:
+    # Wraps a genai.GenerativeModel-like object so generate_content goes through an Outbound
+    # gate. The prompt is the coalescing key; it already names the answer language.
+    def __init__(self, model, outbound):
+        self.model = model
+        self.outbound = outbound
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self.outbound.stream(("stream", prompt), lambda timeout: iter(self.model.generate_content(
+                prompt, stream=True, request_options={"timeout": timeout})))
+        return self.outbound.call(("generate", prompt), lambda timeout: self.model.generate_content(
+            prompt, request_options={"timeout": timeout}))
+
+GEMINI = Outbound("gemini", max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+                  deadline_seconds=float(os.getenv("GEMINI_DEADLINE", "60")))
+TTS = Outbound("tts", max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", "8")),
+               deadline_seconds=float(os.getenv("TTS_DEADLINE", "20")))
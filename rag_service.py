@@ -0,0 +1,211 @@
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from langchain_core.documents import Document
+from hybrid_retriever import hybrid_fuse, load_bm25
+
+# Async retrieval/answer service over the vector_db knowledge base. Concurrent queries
+# are coalesced into micro-batches: one embed_documents call and one FAISS search per
+# batch. With a BM25 index (vector_db/bm25.json) each query's dense ranking is then fused
+# with BM25 exactly like HybridRetriever does for the RAG chain. A batch is flushed when
+# it is full or when its oldest query has waited max_wait_ms. Served over a small local
+# HTTP endpoint (k is capped at max_k):
+#   POST /retrieve {"query": ..., "k": 3}  -> {"documents": [{"text", "metadata"}]}
+#   POST /answer   {"query": ...}          -> {"answer", "documents"}
+#   GET  /stats                            -> batching counters
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch=32, max_wait_ms=5.0):
+        self.batch_fn = batch_fn  # blocking: list of items -> list of results
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.worker = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker:
+            self.worker.cancel()
+            await asyncio.gather(self.worker, return_exceptions=True)
+
+    async def submit(self, item):
+        if self.worker is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.batch_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+class RagService:
+    def __init__(self, database, llm=None, prompt_template=None, k=3, max_batch=32, max_wait_ms=5.0,
+                 bm25=None, fetch_k=20, max_k=20):
+        self.database = database
+        self.llm = llm
+        self.prompt_template = prompt_template
+        self.k = k
+        self.bm25 = bm25
+        self.fetch_k = fetch_k
+        self.max_k = max_k
+        self.batcher = MicroBatcher(self._retrieve_batch, max_batch, max_wait_ms)
+
+    def _retrieve_batch(self, items):
+        queries = [query for query, _ in items]
+        max_k = max(k for _, k in items)
+        if self.bm25 is not None:
+            max_k = max(max_k, self.fetch_k)
+        vectors = np.asarray(self.database.embedding_function.embed_documents(queries), dtype="float32")
+        _, positions = self.database.index.search(vectors, max_k)
+        results = []
+        for row, (query, k) in zip(positions, items):
+            dense = [self.database.index_to_docstore_id[int(p)] for p in row if p != -1]
+            if self.bm25 is not None:
+                results.append(hybrid_fuse(self.database, self.bm25, query, dense, k, self.fetch_k))
+                continue
+            docs = (self.database.docstore.search(doc_id) for doc_id in dense[:k])
+            results.append([doc for doc in docs if isinstance(doc, Document)])
+        return results
+
+    def check_request(self, data):
+        # Validated (query, k) of a request body; anything wrong is a ValueError (400) here
+        # rather than an exception that fails every query in the same micro-batch
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        query, k = data.get("query"), data.get("k")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("query must be a non-empty string")
+        if k is not None and (not isinstance(k, int) or isinstance(k, bool) or k < 1):
+            raise ValueError("k must be a positive integer")
+        return query, min(k, self.max_k) if k is not None else None
+
+    async def retrieve(self, query, k=None):
+        return await self.batcher.submit((query, k or self.k))
+
+    async def answer(self, query, k=None):
+        if self.llm is None:
+            raise ValueError("RagService was started without an LLM, only /retrieve is available.")
+        docs = await self.retrieve(query, k)
+        # Same prompt as the RAG chain's "stuff" step: documents joined by blank lines
+        context = "\n\n".join(doc.page_content for doc in docs)
+        prompt = self.prompt_template.format(context=context, question=query)
+        result = await asyncio.get_running_loop().run_in_executor(None, self.llm.invoke, prompt)
+        return getattr(result, "content", result), docs
+
+    def stats(self):
+        batches = self.batcher.batches
+        return {"batches": batches, "queries": self.batcher.items,
+                "avg_batch_size": self.batcher.items / batches if batches else 0.0}
+
+def doc_to_json(doc):
+    return {"text": doc.page_content, "metadata": doc.metadata}
+
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None, None, None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, json.loads(body) if body else {}
+
+async def write_response(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+    writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    writer.close()
+
+def make_handler(service):
+    async def handle(reader, writer):
+        try:
+            method, path, data = await read_request(reader)
+            if method is None:
+                writer.close()
+                return
+            if method == "GET" and path == "/stats":
+                await write_response(writer, 200, service.stats())
+            elif method == "POST" and path == "/retrieve":
+                start = time.perf_counter()
+                docs = await service.retrieve(*service.check_request(data))
+                await write_response(writer, 200, {"documents": [doc_to_json(d) for d in docs],
+                                                   "ms": (time.perf_counter() - start) * 1000})
+            elif method == "POST" and path == "/answer":
+                answer, docs = await service.answer(*service.check_request(data))
+                await write_response(writer, 200, {"answer": answer, "documents": [doc_to_json(d) for d in docs]})
+            else:
+                await write_response(writer, 404, {"error": f"no route for {method} {path}"})
+        except (KeyError, ValueError) as e:
+            await write_response(writer, 400, {"error": str(e)})
+        except Exception as e:
+            await write_response(writer, 500, {"error": str(e)})
+    return handle
+
+async def start_server(service, host="127.0.0.1", port=8765):
+    service.batcher.start()
+    return await asyncio.start_server(make_handler(service), host, port)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve vector_db retrieval and answers over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-k", type=int, default=20, help="largest k a request may ask for")
+    args = parser.parse_args()
+
+    # Reuse the knowledge base and LLM set up for the RAG chain
+    from connection_memory_to_llm import (CUSTOM_PROMPT_TEMPLATE, DB_PATH, HUGGINGFACE_REPO_ID, db, load_llm,
+                                          set_custom_prompt)
+    service = RagService(db, load_llm(HUGGINGFACE_REPO_ID), set_custom_prompt(CUSTOM_PROMPT_TEMPLATE),
+                         max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, bm25=load_bm25(DB_PATH),
+                         max_k=args.max_k)
+
+    async def serve():
+        server = await start_server(service, args.host, args.port)
+        print(f"RAG service listening on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import unicodedata
+from collections import namedtuple
+import numpy as np
+from context_builder import classify
+
+# Local off-topic pre-filter. Questions with a vaccination keyword, or follow-ups inside a
+# vaccination conversation, always go to the LLM. Everything else is scored against
+# vaccination topic examples (and the vector_db corpus when available) with the same
+# all-MiniLM-L6-v2 embeddings; below the threshold we answer with the localized
+# rejection right away instead of paying for an LLM round trip.
+# all-MiniLM-L6-v2 is an English model, so questions in Indic or Urdu script are not
+# scored at all by default and go to the LLM (reject_non_latin=True scores them too;
+# check evaluate_relevance_gate.py --reject-non-latin before turning that on).
+
+# Native words for vaccine / vaccination, injection, measles and polio in the app's
+# languages, on top of context_builder's keywords (which are mostly transliterations)
+NATIVE_KEYWORDS = [
+    "लस", "इंजेक्शन", "पोलियो", "पोलिओ", "गोवर",  # Hindi, Marathi
+    "টিকা", "ইনজেকশন", "পোলিও",  # Bengali
+    "રસી", "ઇન્જેક્શન", "પોલિયો", "ઓરી",  # Gujarati
+    "ಲಸಿಕೆ", "ಚುಚ್ಚುಮದ್ದು", "ಪೋಲಿಯೊ", "ದಡಾರ",  # Kannada
+    "കുത്തിവ", "പോളിയോ", "അഞ്ചാംപനി",  # Malayalam
+    "தடுப்பூசி", "ஊசி", "போலியோ", "தட்டம்மை",  # Tamil
+    "టీకా", "ఇంజెక్షన్", "పోలియో", "తట్టు",  # Telugu
+    "ٹیکہ", "ٹیکے", "انجکشن", "پولیو", "خسرہ",  # Urdu
+    "ਟੀਕਾ", "ਟੀਕੇ", "ਪੋਲੀਓ", "ਖਸਰ",  # Punjabi
+    "polio", "immuni", "tika", "teeka",  # English, romanized Hindi
+]
+
+def is_latin_script(text):
+    # True when every letter is Latin (English, or Indian languages typed in Latin letters)
+    return all(unicodedata.name(char, "").startswith("LATIN") for char in text if char.isalpha())
+
+TOPIC_EXAMPLES = [
+    "When is the measles vaccine given to a child?",
+    "What vaccines does a newborn baby need?",
+    "Is the covid vaccine safe during pregnancy?",
+    "Where can I get my child immunized for free?",
+    "What is the immunization schedule in India?",
+    "What are the side effects of the DPT vaccine?",
+    "When should the polio drops be given?",
+    "Is the BCG vaccine necessary at birth?",
+    "At what age is the rubella vaccine given?",
+    "How many doses of hepatitis B vaccine are needed?",
+    "When is vitamin A supplementation given to children?",
+    "Can I register for vaccination online on the CoWIN portal?",
+    "What should I do if my child missed a vaccine dose?",
+    "Is the HPV vaccine available for girls in India?",
+    "Does the rotavirus vaccine cause fever?",
+    "टीकाकरण की समय सारणी क्या है?",
+]
+
+GateDecision = namedtuple("GateDecision", ["relevant", "score", "reason"])
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class RelevanceGate:
+    def __init__(self, embed_fn, threshold=0.2, topic_examples=TOPIC_EXAMPLES, corpus_index=None, embed_many=None,
+                 reject_non_latin=False):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.reject_non_latin = reject_non_latin
+        self.corpus_index = corpus_index
+        embed_many = embed_many or (lambda texts: [embed_fn(text) for text in texts])
+        self.examples = normalize(embed_many(topic_examples))
+        self.centroid = normalize(self.examples.mean(axis=0))
+
+    def score(self, vector):
+        vector = normalize(vector)
+        scores = [float(self.centroid @ vector), float(np.max(self.examples @ vector))]
+        if self.corpus_index is not None and self.corpus_index.ntotal:
+            # squared L2 between unit vectors -> cosine similarity
+            distances, _ = self.corpus_index.search(vector[None, :], 1)
+            scores.append(1.0 - float(distances[0][0]) / 2)
+        return max(scores)
+
+    def check(self, question, in_vaccination_context=False, vector=None):
+        vaccination, follow_up, _ = classify(question)
+        lowered = question.lower()
+        if vaccination or any(keyword in lowered for keyword in NATIVE_KEYWORDS):
+            return GateDecision(True, 1.0, "keyword")
+        if in_vaccination_context and follow_up:
+            return GateDecision(True, 1.0, "follow-up")
+        if not self.reject_non_latin and not is_latin_script(question):
+            return GateDecision(True, 1.0, "non-latin script")
+        if vector is None:
+            vector = self.embed_fn(question)
+        score = self.score(vector)
+        if score < self.threshold:
+            return GateDecision(False, score, "low similarity")
+        return GateDecision(True, score, "similarity")
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from relevance_gate import is_latin_script
+
+# Semantic answer cache: previous answers are looked up by cosine similarity of the
+# question embedding. Entries are scoped by language and by the conversation context
+# the answer was generated with, so a follow-up ("where do I get it?") is never served
+# an answer that was produced for a different context.
+# The embedding model (all-MiniLM-L6-v2) is English-only, so questions in Indic or Urdu
+# script are matched on their normalized text instead, and only against each other;
+# similarity is used between Latin-script questions only.
+# With a path, the cache is written by a background thread at most every save_interval
+# seconds (and at exit), so storing an answer never writes the file on the request path.
+
+def context_key(lang, context):
+    return f"{lang}:{hashlib.sha1(context.encode('utf-8')).hexdigest()}"
+
+def normalize_question(question):
+    return " ".join(question.lower().split()).rstrip("?.!।॥۔؟ ")
+
+class SemanticCache:
+    def __init__(self, embed_fn, threshold=0.92, max_entries=1000, ttl_seconds=7 * 24 * 3600, path=None,
+                 save_interval=5.0):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.save_interval = save_interval
+        self.entries = OrderedDict()  # entry id -> dict, oldest (least recently used) first
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = threading.Event()
+        if path:
+            if os.path.exists(path):
+                self.load()
+            threading.Thread(target=self._persist_loop, daemon=True).start()
+            atexit.register(self.flush)
+
+    def embed(self, question):
+        vector = np.asarray(self.embed_fn(question), dtype="float32")
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def lookup(self, vector, lang, context="", question=None):
+        # question=None is treated as Latin script (similarity lookup)
+        scope = context_key(lang, context)
+        latin = question is None or is_latin_script(question)
+        now = time.time()
+        with self.lock:
+            for entry_id in [eid for eid, e in self.entries.items() if self.expired(e, now)]:
+                del self.entries[entry_id]
+            candidates = [(eid, e) for eid, e in self.entries.items()
+                          if e["scope"] == scope and e["latin"] == latin]
+            match = None
+            if candidates and latin:
+                scores = np.stack([e["vector"] for _, e in candidates]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = candidates[best]
+            elif candidates:
+                key = normalize_question(question)
+                match = next(((eid, e) for eid, e in reversed(candidates)
+                              if normalize_question(e["question"]) == key), None)
+            if match is not None:
+                entry_id, entry = match
+                self.entries.move_to_end(entry_id)
+                self.hits += 1
+                return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, vector, lang, context, question, answer):
+        with self.lock:
+            self.entries[self.next_id] = {
+                "scope": context_key(lang, context),
+                "vector": vector,
+                "question": question,
+                "latin": is_latin_script(question),
+                "answer": answer,
+                "created": time.time(),
+            }
+            self.next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.path:
+            self.dirty.set()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+    def _persist_loop(self):
+        while True:
+            self.dirty.wait()
+            # Stores that arrive within the interval go out in one write
+            time.sleep(self.save_interval)
+            self.flush()
+
+    def flush(self):
+        # Writes pending entries; waits for a save that is already running
+        with self.save_lock:
+            if not self.dirty.is_set():
+                return
+            self.dirty.clear()
+            try:
+                self._write()
+            except OSError as e:
+                # the entries are still in memory, the next round retries the write
+                self.dirty.set()
+                print(f"Answer cache save failed: {e}")
+
+    def save(self):
+        self.dirty.set()
+        self.flush()
+
+    def _write(self):
+        with self.lock:
+            data = [{**e, "vector": e["vector"].tolist()} for e in self.entries.values()]
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self.lock:
+            for e in data[-self.max_entries:]:
+                self.entries[self.next_id] = {**e, "vector": np.asarray(e["vector"], dtype="float32"),
+                                              "latin": is_latin_script(e["question"])}
+                self.next_id += 1
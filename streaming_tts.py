@@ -0,0 +1,201 @@
+import re
+import time
+import queue
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentence-pipelined TTS: the LLM response is consumed as a stream, cut at sentence
+# boundaries, and every finished sentence is handed to a TTS worker while later
+# tokens are still arriving. Audio comes back in sentence order, so the first
+# sentence can play before generation has finished.
+
+# Latin, Devanagari (।, ॥) and Urdu (۔) sentence ends, followed by whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?।॥۔])\s+")
+
+class SentenceSplitter:
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+
+    def feed(self, chunk):
+        # Returns the sentences completed by this chunk
+        self.text += chunk
+        self.buffer += chunk
+        parts = SENTENCE_END.split(self.buffer)
+        self.buffer = parts[-1]
+        return [sentence.strip() for sentence in parts[:-1] if sentence.strip()]
+
+    def finish(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+def _read_stream(text_chunks, events, stopped):
+    try:
+        for chunk in text_chunks:
+            events.put(("text", chunk))
+            if stopped.is_set():
+                break
+        events.put(("end", None))
+    except Exception as e:
+        events.put(("error", e))
+    finally:
+        close = getattr(text_chunks, "close", None)
+        if close:
+            close()
+
+def stream_answer(text_chunks, synthesize, on_text=None, max_workers=3):
+    # Yields (sentence, audio) pairs in order, as soon as the head sentence's audio is ready.
+    # The LLM stream is read on its own thread and finished TTS calls report back through
+    # the same queue, so audio is handed out while tokens are still arriving. on_text and
+    # the yields stay on the caller's thread, which Streamlit needs for rendering.
+    events = queue.Queue()
+    stopped = threading.Event()
+    splitter = SentenceSplitter()
+    pending = deque()
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(sentence):
+        future = pool.submit(contextvars.copy_context().run, synthesize, sentence)
+        future.add_done_callback(lambda _: events.put(("audio", None)))
+        pending.append((sentence, future))
+
+    reader = threading.Thread(target=contextvars.copy_context().run, args=(_read_stream, text_chunks, events, stopped),
+                              daemon=True)
+    reader.start()
+    reading = True
+    try:
+        while reading or pending:
+            kind, value = events.get()
+            if kind == "text" and value:
+                sentences = splitter.feed(value)
+                if on_text:
+                    on_text(splitter.text)
+                for sentence in sentences:
+                    submit(sentence)
+            elif kind == "end":
+                reading = False
+                for sentence in splitter.finish():
+                    submit(sentence)
+            elif kind == "error":
+                raise value
+            while pending and pending[0][1].done():
+                sentence, future = pending.popleft()
+                yield sentence, future.result()
+    finally:
+        stopped.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def gemini_text_chunks(llm, prompt):
+    for chunk in llm.generate_content(prompt, stream=True):
+        yield chunk.text
+
+# MPEG audio version bits -> (sample rates, samples per Layer III frame, bitrates in kbps)
+MP3_VERSIONS = {
+    3: ((44100, 48000, 32000), 1152, (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)),
+    2: ((22050, 24000, 16000), 576, (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)),
+    0: ((11025, 12000, 8000), 576, (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)),
+}
+
+def mp3_duration(data):
+    # Seconds of audio in MPEG Layer III data such as gTTS output, summed over its frames
+    pos, seconds = 0, 0.0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        pos = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+    while pos + 4 <= len(data):
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+        if (data[pos] != 0xFF or b1 & 0xE0 != 0xE0 or version not in MP3_VERSIONS or layer != 1
+                or bitrate_index in (0, 15) or rate_index == 3):
+            pos += 1
+            continue
+        rates, samples, bitrates = MP3_VERSIONS[version]
+        rate = rates[rate_index]
+        pos += samples // 8 * bitrates[bitrate_index] * 1000 // rate + ((b2 >> 1) & 1)
+        seconds += samples / rate
+    return seconds
+
+class ClipSequencer:
+    # Autoplays audio clips one after another: a queued clip is rendered (with autoplay) once
+    # the previous one has finished playing, so sentence clips don't talk over each other.
+    # pump() renders what is due without blocking; finish() plays out the rest.
+    def __init__(self, render):
+        self.render = render
+        self.clips = deque()
+        self.free_at = 0.0
+
+    def play(self, audio):
+        self.clips.append(audio)
+        self.pump()
+
+    def pump(self):
+        while self.clips and time.monotonic() >= self.free_at:
+            self._render(self.clips.popleft())
+
+    def finish(self):
+        while self.clips:
+            self._sleep_until_free()
+            self._render(self.clips.popleft())
+        self._sleep_until_free()
+
+    def _render(self, audio):
+        self.render(audio)
+        self.free_at = time.monotonic() + mp3_duration(audio)
+
+    def _sleep_until_free(self):
+        delay = self.free_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+# Offline stand-ins with the same shape as genai.GenerativeModel and gTTS synthesis
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+class StubLLM:
+    def __init__(self, answer, token_delay=0.02, words_per_chunk=3):
+        self.answer = answer
+        self.token_delay = token_delay
+        self.words_per_chunk = words_per_chunk
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        if not stream:
+            time.sleep(self.token_delay * len(self.answer.split()) / self.words_per_chunk)
+            return StubChunk(self.answer)
+        return self._stream()
+
+    def _stream(self):
+        words = self.answer.split(" ")
+        for i in range(0, len(words), self.words_per_chunk):
+            time.sleep(self.token_delay)
+            yield StubChunk(" ".join(words[i:i + self.words_per_chunk]) + " ")
+
+def stub_tts(seconds_per_char=0.002):
+    def synthesize(text):
+        time.sleep(0.05 + seconds_per_char * len(text))
+        return text.encode("utf-8")
+    return synthesize
+
+def main():
+    answer = ("The measles-rubella vaccine is given at 9 to 12 months. A second dose is given at 16 to 24 months. "
+              "Both doses are free at government health centres. Carry the child's immunization card when you go.")
+    synthesize = stub_tts()
+
+    start = time.perf_counter()
+    text = StubLLM(answer).generate_content("", stream=False).text
+    synthesize(text)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_audio = None
+    for _ in stream_answer(gemini_text_chunks(StubLLM(answer), ""), synthesize):
+        first_audio = first_audio or time.perf_counter() - start
+    streamed = time.perf_counter() - start
+
+    print(f"sequential: first audio after {sequential * 1000:.0f} ms")
+    print(f"streamed:   first audio after {first_audio * 1000:.0f} ms, all audio after {streamed * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
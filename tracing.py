@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Per-request stage timings. A request opens a trace, code anywhere below it (app.py,
+# the RAG chain, the retriever) wraps its work in `stage(name)`, and when the request
+# ends one JSON line with every stage's milliseconds is written to the trace file.
+# The tracer also keeps recent samples per stage for p50/p95/p99. `stage()` is a
+# no-op when no request is active, so instrumented code runs unchanged outside traces.
+
+_current = contextvars.ContextVar("trace", default=None)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.stages = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, ms):
+        # Worker threads (streamed TTS, the LLM stream reader) add stages concurrently
+        with self.lock:
+            self.stages[name] += ms
+
+class Tracer:
+    def __init__(self, path=None, max_samples=10000):
+        self.path = path
+        self.max_samples = max_samples
+        self.samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def request(self, name, **attrs):
+        trace = Trace(name, attrs)
+        token = _current.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            total_ms = (time.perf_counter() - start) * 1000
+            self.finish(trace, total_ms)
+
+    def finish(self, trace, total_ms):
+        record = {"id": trace.id, "request": trace.name, "start": trace.started,
+                  "total_ms": round(total_ms, 3), "stages": {k: round(v, 3) for k, v in trace.stages.items()},
+                  **trace.attrs}
+        with self.lock:
+            self.samples[f"{trace.name}.total"].append(total_ms)
+            for stage_name, ms in trace.stages.items():
+                self.samples[stage_name].append(ms)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def record(self, name, ms):
+        # Stand-alone timing that doesn't belong to a request (e.g. the st.rerun() cycle)
+        with self.lock:
+            self.samples[name].append(ms)
+
+    def summary(self):
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+        return {name: {"count": len(values), "p50": percentile(values, 50),
+                       "p95": percentile(values, 95), "p99": percentile(values, 99)}
+                for name, values in sorted(samples.items())}
+
+    def format_summary(self):
+        lines = [f"{'stage':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<28} {s['count']:>6} {s['p50']:>9.2f} {s['p95']:>9.2f} {s['p99']:>9.2f}")
+        return "\n".join(lines)
+
+def current_trace():
+    return _current.get()
+
+@contextmanager
+def stage(name):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, (time.perf_counter() - start) * 1000)
+
+class StageCallbackHandler(BaseCallbackHandler):
+    # Times the retriever and LLM runs of a LangChain chain as "retrieval" and "llm" stages
+    # of the trace that is active when the handler is created. The time between the end of
+    # retrieval and the start of the LLM call (combining documents, formatting the prompt)
+    # is the "prompt_build" stage.
+    def __init__(self):
+        self.trace = _current.get()
+        self.started = {}
+        self.retrieved_at = None
+
+    def _start(self, run_id):
+        now = time.perf_counter()
+        self.started[run_id] = now
+        return now
+
+    def _end(self, name, run_id):
+        start = self.started.pop(run_id, None)
+        if start is not None and self.trace is not None:
+            self.trace.add_stage(name, (time.perf_counter() - start) * 1000)
+
+    def _llm_started(self, run_id):
+        now = self._start(run_id)
+        if self.retrieved_at is not None and self.trace is not None:
+            self.trace.add_stage("prompt_build", (now - self.retrieved_at) * 1000)
+        self.retrieved_at = None
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end("retrieval", run_id)
+        self.retrieved_at = time.perf_counter()
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end("retrieval", run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._llm_started(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._llm_started(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+TRACER = Tracer(os.getenv("TRACE_PATH"))
@@ -0,0 +1,87 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from gtts import gTTS
+from outbound import TTS
+
+# Content-addressed TTS audio: mp3 bytes are kept per (text, lang, tld) in a size-bounded
+# LRU in RAM, optionally backed by a directory of <sha256>.mp3 files. Each response gets
+# its own bytes, so concurrent sessions never share an output file.
+
+def gtts_synthesize(text, lang, tld, timeout=None):
+    # gTTS's public API only: it splits long text, sends the requests and raises gTTSError
+    audio = BytesIO()
+    gTTS(text=text, lang=lang, tld=tld, timeout=timeout).write_to_fp(audio)
+    return audio.getvalue()
+
+def gtts_bytes(text, lang, tld):
+    # Concurrent requests for the same audio share one upstream call; the TTS gate also
+    # bounds concurrency and retries rate-limited calls
+    return TTS.call(("gtts", text, lang, tld), lambda timeout: gtts_synthesize(text, lang, tld, timeout))
+
+def audio_key(text, lang, tld):
+    return hashlib.sha256(f"{lang}\0{tld}\0{text}".encode("utf-8")).hexdigest()
+
+class AudioCache:
+    def __init__(self, synthesize=gtts_bytes, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.synthesize = synthesize
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()  # key -> mp3 bytes, least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _remember(self, key, audio):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = audio
+            self.size += len(audio)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+
+    def get(self, text, lang, tld="co.in"):
+        key = audio_key(text, lang, tld)
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return audio
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), "rb") as f:
+                audio = f.read()
+            self.hits += 1
+        else:
+            audio = self.synthesize(text, lang, tld)
+            self.misses += 1
+            if self.disk_dir:
+                tmp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, self._disk_path(key))
+        self._remember(key, audio)
+        return audio
+
+    def prewarm(self, items):
+        # items: iterable of (text, lang, tld); fixed strings are synthesized once up front
+        for text, lang, tld in items:
+            try:
+                self.get(text, lang, tld)
+            except Exception as e:
+                # a failed prewarm only means the first real request synthesizes it
+                print(f"TTS prewarm failed for {lang}: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.size}
@@ -0,0 +1,207 @@
+import os
+import json
+import sqlite3
+import faiss
+import numpy as np
+from collections.abc import Mapping
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# Index types that memory_for_llm.py can build. "flat" is the exact search we always had,
+# the others trade a little recall for sub-linear search / smaller indexes.
+INDEX_TYPES = ["flat", "ivf", "hnsw", "ivfpq", "sq8", "ivfsq8"]
+# FAISS remove_ids only renumbers the remaining vectors of flat-coded indexes. IVF lists
+# keep their old labels and HNSW can't remove at all, so LangChain's compacted position ->
+# docstore id map would point at the wrong chunks; the other types are rebuilt instead.
+IN_PLACE_DELETE_TYPES = ["flat", "sq8"]
+META_FILE = "index_meta.json"
+
+# Docstore backends: "pickle" is langchain's index.pkl, "sqlite" keeps chunk text and
+# metadata on disk in docstore.sqlite and only reads the rows a search returns.
+DOCSTORE_BACKENDS = ["pickle", "sqlite"]
+SQLITE_FILE = "docstore.sqlite"
+
+DEFAULT_PARAMS = {
+    "nlist": 256,       # IVF clusters (capped by corpus size)
+    "nprobe": 16,       # IVF clusters scanned per query
+    "hnsw_m": 32,       # HNSW graph degree
+    "ef_construction": 80,
+    "ef_search": 64,
+    "pq_m": 48,         # PQ sub-quantizers, must divide the embedding dim (384)
+    "pq_nbits": 8,
+}
+# Applied to the loaded index from index_meta.json, changing them needs no rebuild
+SEARCH_PARAMS = ("nprobe", "ef_search")
+
+def index_factory_string(index_type, dim, num_vectors, params):
+    # IVF needs ~39 training points per cluster, keep nlist sane on small corpora
+    nlist = max(1, min(params["nlist"], num_vectors // 39))
+    params["nlist"] = nlist
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['hnsw_m']}"
+    if index_type == "ivfpq":
+        if dim % params["pq_m"]:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dim {dim}")
+        # PQ codebooks want ~39 training points per centroid as well
+        while params["pq_nbits"] > 4 and num_vectors < 39 * (1 << params["pq_nbits"]):
+            params["pq_nbits"] -= 1
+        return f"IVF{nlist},PQ{params['pq_m']}x{params['pq_nbits']}"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "ivfsq8":
+        return f"IVF{nlist},SQ8"
+    raise ValueError(f"Unknown index type '{index_type}', choose one of {INDEX_TYPES}")
+
+def apply_search_params(index, params):
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = params.get("ef_search", DEFAULT_PARAMS["ef_search"])
+    try:
+        faiss.extract_index_ivf(index).nprobe = params.get("nprobe", DEFAULT_PARAMS["nprobe"])
+    except RuntimeError:
+        pass  # not an IVF index
+
+def build_index(vectors, index_type="flat", params=None):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    num_vectors, dim = vectors.shape
+    # Explicitly requested build params, so later builds can tell what actually changed
+    build_params = {key: value for key, value in (params or {}).items() if key not in SEARCH_PARAMS}
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    factory = index_factory_string(index_type, dim, num_vectors, params)
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, params)
+    meta = {
+        "index_type": index_type,
+        "factory": factory,
+        "params": params,
+        "build_params": build_params,
+        "dim": dim,
+        "ntotal": int(index.ntotal),
+        "trained_on": num_vectors if index_type not in ("flat", "hnsw") else 0,
+    }
+    return index, meta
+
+def all_vectors(index):
+    return index.reconstruct_n(0, index.ntotal)
+
+def convert_index(database, index_type, params=None):
+    # Swap the FAISS index under a langchain store, keeping docstore and id mapping intact
+    # (build_index adds vectors in the same order, so the positions still line up).
+    index, meta = build_index(all_vectors(database.index), index_type, params)
+    database.index = index
+    return database, meta
+
+def save_index_meta(path, meta):
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+
+def load_index_meta(path):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return {"index_type": "flat", "factory": "Flat", "params": {}}
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+class SQLiteDocstore(Docstore):
+    # Read side of docstore.sqlite: chunks are fetched lazily by docstore id after
+    # a search, so startup doesn't unpickle every chunk and the pages are shared
+    # between worker processes through the OS cache.
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, check_same_thread=False)
+
+    def search(self, search):
+        row = self.conn.execute("SELECT text, metadata FROM chunks WHERE doc_id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+class SQLiteIdMap(Mapping):
+    # Lazy stand-in for FAISS.index_to_docstore_id (vector position -> docstore id)
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getitem__(self, position):
+        row = self.conn.execute("SELECT doc_id FROM chunks WHERE position = ?", (int(position),)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __iter__(self):
+        return (row[0] for row in self.conn.execute("SELECT position FROM chunks ORDER BY position"))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+def write_sqlite_docstore(database, db_file):
+    tmp_file = db_file + ".tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    conn.execute("CREATE TABLE chunks (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, "
+                 "text TEXT NOT NULL, metadata TEXT NOT NULL)")
+    rows = []
+    for position, doc_id in database.index_to_docstore_id.items():
+        doc = database.docstore.search(doc_id)
+        rows.append((int(position), doc_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+    conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    os.replace(tmp_file, db_file)
+
+def read_sqlite_docstore(db_file):
+    conn = sqlite3.connect(db_file)
+    docs, id_map = {}, {}
+    for position, doc_id, text, metadata in conn.execute("SELECT position, doc_id, text, metadata FROM chunks"):
+        docs[doc_id] = Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+        id_map[position] = doc_id
+    conn.close()
+    return InMemoryDocstore(docs), id_map
+
+def read_faiss_index(index_file, mmap=False):
+    if mmap:
+        try:
+            return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0))
+        except RuntimeError:
+            pass  # this index type can't be memory-mapped by faiss, read it normally
+    return faiss.read_index(index_file)
+
+def save_vector_db(database, path, docstore_backend="pickle"):
+    if docstore_backend == "pickle":
+        database.save_local(path)
+        return
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(database.index, os.path.join(path, "index.faiss"))
+    write_sqlite_docstore(database, os.path.join(path, SQLITE_FILE))
+    pickle_file = os.path.join(path, "index.pkl")
+    if os.path.exists(pickle_file):
+        os.remove(pickle_file)
+
+def load_vector_db(path, embedding_model, writable=False):
+    # The index type and docstore backend are picked up from index_meta.json; old
+    # indexes without it are flat with a pickled docstore.
+    meta = load_index_meta(path)
+    if meta.get("docstore", "pickle") == "pickle":
+        database = FAISS.load_local(path, embedding_model, allow_dangerous_deserialization=True)
+    else:
+        db_file = os.path.join(path, SQLITE_FILE)
+        if writable:
+            # ingest needs add/delete, so materialize the docstore in memory
+            index = faiss.read_index(os.path.join(path, "index.faiss"))
+            docstore, id_map = read_sqlite_docstore(db_file)
+        else:
+            index = read_faiss_index(os.path.join(path, "index.faiss"), mmap=True)
+            docstore = SQLiteDocstore(db_file)
+            id_map = SQLiteIdMap(docstore.conn)
+        database = FAISS(embedding_model, index, docstore, id_map)
+    apply_search_params(database.index, meta.get("params", {}))
+    return database
@@ -0,0 +1,130 @@
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from streaming_tts import gemini_text_chunks, stream_answer
+from tracing import current_trace, stage
+
+# The question -> answer -> audio path of app.py without any Streamlit calls, so the same
+# code runs in the app and in benchmark_pipeline.py with stub STT/LLM/TTS backends.
+# Every step is wrapped in a tracing stage.
+
+LANGUAGES = {
+    "Hindi": "hi", "English": "en", "Bengali": "bn", "Gujarati": "gu", "Kannada": "kn",
+    "Malayalam": "ml", "Marathi": "mr", "Tamil": "ta", "Telugu": "te", "Urdu": "ur", "Punjabi": "pa"
+}
+
+REJECTION_MESSAGES = {
+    "Hindi": "केवल टीकाकरण से संबंधित प्रश्न पूछें।",
+    "English": "Ask me only vaccination-related questions.",
+    "Bengali": "শুধুমাত্র ভ্যাকসিনেশন সম্পর্কিত প্রশ্ন জিজ্ঞাসা করুন।",
+    "Gujarati": "મને ફક્ત રસીકરણ સંબંધિત પ્રશ્નો પૂછો।",
+    "Kannada": "ನನಗೆ ಕೇವಲ ಲಸಿಕೆ ಸಂಬಂಧಿತ ಪ್ರಶ್ನೆಗಳನ್ನು ಕೇಳಿ।",
+    "Malayalam": "വാക്സിനേഷനുമായി ബന്ധപ്പെട്ട ചോദ്യങ്ങൾ മാത്രം ചോദിക്കുക।",
+    "Marathi": "मला फक्त लसीकरणाशी संबंधित प्रश्न विचारा।",
+    "Tamil": "தடுப்பூசி தொடர்பான கேள்விகளை மட்டும் கேளுங்கள்।",
+    "Telugu": "నాకు కేవలం వాక్సినేషన్ సంబంధిత ప్రశ్నలు మాత్రమే అడగండి।",
+    "Urdu": "مجھ سے صرف ویکسینیشن سے متعلق سوالات پوچھیں۔",
+    "Punjabi": "ਮੈਨੂੰ ਸਿਰਫ ਟੀਕਾਕਰਨ ਨਾਲ ਸਬੰਧਤ ਸਵਾਲ ਪੁੱਛੋ।"
+}
+
+PipelineResult = namedtuple("PipelineResult", ["answer", "source", "streamed"])
+
+def clean_text(text):
+    return text.replace("**", "").replace("*", "").strip()
+
+def build_prompt(selected_lang, context, raw_text, grounding=""):
+    prompt = (
+        f"You are a vaccination assistant for India. Answer all questions in {selected_lang}, including rejections. "
+        "A question is vaccination-related if it contains terms like 'vaccine', 'vaccination', 'टीकाकरण', 'measles', 'खसरा', 'rubella', 'रूबेला', 'covid', 'vitamin', 'विटामिन', "
+        "or follow-up terms like 'where', 'कहाँ', 'get', 'पाएं', 'this', 'यह', 'child', 'बच्चा', 'is', 'क्या', 'does', 'दिया', 'given', 'supplement', 'सप्लीमेंट', 'necessary', 'जरूरी' "
+        "after a vaccination question. Use the context below only if the question relates to it. "
+        f"If the question is not vaccination-related, respond with exactly: '{REJECTION_MESSAGES[selected_lang]}' and ignore context. "
+        f"Previous Vaccination-Related Context (if relevant):\n{context}\n\n"
+        f"Current Question: {raw_text}"
+    )
+    if grounding:
+        prompt += f"\n\nReference information from vaccination guidelines (use only if relevant):\n{grounding}"
+    return prompt
+
+class VoicePipeline:
+    def __init__(self, load_llm, synthesize, answer_cache=None, relevance_gate=None, fetch_grounding=None, stream=True):
+        self.load_llm = load_llm          # () -> object with generate_content(prompt, stream=...)
+        self.synthesize = synthesize      # (text, lang_code) -> mp3 bytes
+        self.answer_cache = answer_cache
+        self.relevance_gate = relevance_gate
+        self.fetch_grounding = fetch_grounding
+        self.stream = stream
+
+    def answer(self, raw_text, selected_lang, context="", on_text=None, on_audio=None, tts_context=nullcontext):
+        # on_text(partial_answer) renders text, on_audio(mp3_bytes, autoplay) plays audio.
+        # Streamed answers arrive as one clip per sentence, all with autoplay, in order.
+        on_text = on_text or (lambda partial: None)
+        on_audio = on_audio or (lambda audio, autoplay: None)
+        lang_code = LANGUAGES[selected_lang]
+        answer, source, vector = None, "llm", None
+
+        if self.answer_cache is not None:
+            with stage("embed"):
+                vector = self.answer_cache.embed(raw_text)
+        # Clearly off-topic questions get the localized rejection without an LLM call
+        if self.relevance_gate is not None:
+            with stage("relevance_gate"):
+                decision = self.relevance_gate.check(raw_text, in_vaccination_context=bool(context), vector=vector)
+            if not decision.relevant:
+                answer, source = REJECTION_MESSAGES[selected_lang], "gate"
+        # Near-identical questions in the same language and context reuse the stored answer
+        # (identical ones for Indic/Urdu-script questions, see semantic_cache.py)
+        if answer is None and self.answer_cache is not None:
+            with stage("cache_lookup"):
+                answer = self.answer_cache.lookup(vector, selected_lang, context, raw_text)
+            if answer is not None:
+                source = "cache"
+
+        streamed = False
+        if answer is None:
+            grounding = ""
+            if self.fetch_grounding is not None:
+                with stage("grounding"):
+                    grounding = self.fetch_grounding(raw_text)
+            with stage("prompt_build"):
+                prompt = build_prompt(selected_lang, context, raw_text, grounding)
+            llm = self.load_llm()
+            if self.stream:
+                answer = self._stream(llm, prompt, lang_code, on_text, on_audio)
+                streamed = True
+            else:
+                with stage("llm"):
+                    response = llm.generate_content(prompt)
+                answer = clean_text(response.text)
+            # An empty answer (e.g. a stream that produced no text) is never served again
+            if self.answer_cache is not None and answer:
+                with stage("cache_store"):
+                    self.answer_cache.store(vector, selected_lang, context, raw_text, answer)
+
+        if not streamed:
+            on_text(answer)
+            with tts_context(), stage("tts"):
+                audio = self.synthesize(answer, lang_code)
+            on_audio(audio, False)
+        return PipelineResult(answer, source, streamed)
+
+    def _stream(self, llm, prompt, lang_code, on_text, on_audio):
+        # LLM and TTS overlap here, so they share one stage; time to first audio is its own
+        full_text = ""
+
+        def render(partial):
+            nonlocal full_text
+            full_text = partial
+            on_text(clean_text(partial))
+
+        trace = current_trace()
+        start = time.perf_counter()
+        with stage("llm_tts_stream"):
+            sentences = stream_answer(gemini_text_chunks(llm, prompt),
+                                      lambda sentence: self.synthesize(sentence, lang_code),
+                                      on_text=render)
+            for i, (_, audio) in enumerate(sentences):
+                if i == 0 and trace is not None:
+                    trace.add_stage("first_audio", (time.perf_counter() - start) * 1000)
+                on_audio(audio, True)
+        return clean_text(full_text)